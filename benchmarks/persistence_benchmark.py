@@ -0,0 +1,50 @@
+"""Sweeps per second folded into the persistence map.
+
+    python -m benchmarks.persistence_benchmark [--sweeps N] [--length N]
+
+Fills a DataHub with noise, then repeatedly gathers --sweeps sweeps of
+--length samples at random trigger points (with sub-sample offsets) and
+folds them into a PersistenceMap in one batch, as a widget does with the
+sweeps completed between two frames.
+"""
+import argparse
+import time
+
+import numpy as np
+from src.data_hub import DataHub
+from src.persistence import PersistenceMap, sweep_traces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sweeps", type=int, default=2000, help="Sweeps per batch")
+    parser.add_argument("--length", type=int, default=500, help="Samples per sweep")
+    parser.add_argument("--depth", type=int, default=1_000_000, help="Hub depth in samples")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    hub = DataHub(2, args.depth, dtype=np.float32)
+    hub.write(rng.normal(0, 1, (args.depth, 2)).astype(np.float32))
+    persistence = PersistenceMap()
+    persistence.set_range(0, 1, -4, 4)
+    x_axis = np.linspace(0, 1, args.length)
+    pre = args.length // 2
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        indices = np.sort(rng.integers(pre, args.depth - args.length + pre, args.sweeps))
+        offsets = rng.uniform(-1, 0, args.sweeps)
+        x, y = sweep_traces(hub, 0, indices, offsets, pre, args.length, x_axis)
+        persistence.accumulate(x, y, elapsed_s=0.033)
+    elapsed = time.perf_counter() - t0
+
+    total = args.sweeps * args.repeat
+    print(f"{total} sweeps of {args.length} samples in {elapsed:.3f} s: "
+          f"{total / elapsed:.0f} sweeps/s ({total * args.length / elapsed / 1e6:.1f} M points/s) "
+          f"into a {persistence.n_columns}x{persistence.n_rows} map")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Segmented memory capture of channel 2 spikes at full acquisition speed.
+
+    python -m benchmarks.segmented_benchmark [--segments N] [--length N] [--block N]
+
+Simulated blocks are written to a DataHub and handed to SegmentedCapture
+as fast as they can be produced, with no display in between. The run
+stops once --segments spikes have been captured and reports the capture
+throughput, the shortest re-arm dead time between two segments and how
+many level crossings were not captured (they came before the handler
+re-armed, or after the last segment).
+"""
+import argparse
+import time
+
+import numpy as np
+from src.data_hub import DataHub
+from src.segmented_capture import SegmentedCapture
+from src.signal_generator import SimulatedSignalGenerator
+from src.trigger_engine import rising_edges
+from src.trigger_handler import TriggerHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=10_000)
+    parser.add_argument("--length", type=int, default=64, help="Samples per segment")
+    parser.add_argument("--block", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=1_000_000, help="Hub depth in samples")
+    parser.add_argument("--level", type=float, default=3.0, help="Trigger level (V)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Nominal sampling rate (Hz)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = SimulatedSignalGenerator(seed=args.seed)
+    hub = DataHub(generator.CHANNELS, args.depth, dtype=np.float32)
+    handler = TriggerHandler(args.length)
+    handler.set_pos_edge_enabled(True)
+    handler.set_level(args.level)
+    capture = SegmentedCapture(hub, handler, args.rate)
+    capture.arm(args.segments, args.length, channel=1)
+
+    block = np.empty((args.block, generator.CHANNELS))
+    crossings = 0
+    previous = None
+    produced = 0
+    t0 = time.perf_counter()
+    while capture.armed:
+        generator.generate(args.block, out=block)
+        hub.write(block)
+        capture.process_block(hub.latest(args.block)[1], hub.write_index - args.block)
+        crossings += rising_edges(block[:, 1], args.level, previous).size
+        previous = block[-1, 1]
+        produced += args.block
+    elapsed = time.perf_counter() - t0
+
+    stats = capture.stats()
+    print(f"{stats['segments']} segments of {args.length} samples from {produced} samples "
+          f"in {elapsed:.3f} s ({produced / elapsed / 1e6:.2f} MS/s, "
+          f"capture only {produced / stats['processing_s'] / 1e6:.2f} MS/s)")
+    print(f"min re-arm dead time: {stats['min_dead_time_samples']} samples "
+          f"({stats['min_dead_time_s'] * 1e3:.3f} ms at {args.rate:g} S/s), "
+          f"shortest trigger interval {stats['min_interval_samples']} samples")
+    print(f"{crossings} crossings of {args.level} V, "
+          f"{crossings - stats['segments']} not captured")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Waterfall rows: np.roll of the whole image vs. WaterfallRing.push().
+
+    python -m benchmarks.waterfall_benchmark [--history N] [--bins N] [--rows N] [--batch N]
+
+The naive path shifts the whole (history, bins) image up by one row with
+np.roll for every new spectrum; WaterfallRing writes the row twice into
+its mirrored ring and hands out a contiguous view. Reports the sustained
+rows per second (one spectrum per call and --batch spectra per call) and
+the memory allocated per row (tracemalloc peak).
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from src.waterfall import WaterfallRing
+
+
+def rolled(image, magnitude):
+    image = np.roll(image, -1, axis=0)
+    image[-1] = 20 * np.log10(np.maximum(magnitude, 1e-10))
+    return image
+
+
+def rows_per_s(push, spectra, batch):
+    t0 = time.perf_counter()
+    for start in range(0, spectra.shape[0], batch):
+        push(spectra[start:start + batch] if batch > 1 else spectra[start])
+    return spectra.shape[0] / (time.perf_counter() - t0)
+
+
+def peak_bytes(push, row):
+    tracemalloc.start()
+    push(row)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=256, help="Rows kept on screen")
+    parser.add_argument("--bins", type=int, default=513)
+    parser.add_argument("--rows", type=int, default=20000, help="Spectra pushed")
+    parser.add_argument("--batch", type=int, default=32, help="Spectra per push in the batched run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spectra = np.random.default_rng(args.seed).random((args.rows, args.bins))
+    state = {'image': np.full((args.history, args.bins), -200.0, dtype=np.float32)}
+
+    def naive_push(row):
+        state['image'] = rolled(state['image'], row)
+
+    ring = WaterfallRing(args.history, args.bins)
+    naive = rows_per_s(naive_push, spectra, 1)
+    single = rows_per_s(ring.push, spectra, 1)
+    batched = rows_per_s(ring.push, spectra, args.batch)
+    print(f"np.roll ({args.history} x {args.bins}):   {naive:10.0f} rows/s, "
+          f"{peak_bytes(naive_push, spectra[0]) / 1024:7.1f} KiB allocated per row")
+    print(f"WaterfallRing.push (1 row): {single:10.0f} rows/s, "
+          f"{peak_bytes(ring.push, spectra[0]) / 1024:7.1f} KiB allocated per row")
+    print(f"WaterfallRing.push ({args.batch} rows): {batched:9.0f} rows/s, "
+          f"ring memory {2 * ring.history * ring.n_bins * 4 / 1024:.0f} KiB whatever the rate")
+
+
+if __name__ == "__main__":
+    main()
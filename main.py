@@ -1,12 +1,16 @@
 from PySide6.QtWidgets import (QSpinBox, QMainWindow, QApplication,
                                QMessageBox, QFileDialog, QComboBox,
                                QDoubleSpinBox, QVBoxLayout, QWidget,
-                               QSplashScreen, QLabel)
-from PySide6.QtGui import QValidator, QDesktopServices, QScreen, QPixmap, QIcon
-from PySide6.QtCore import QTimer, Slot, QCoreApplication, QUrl, QStandardPaths, QDir, Qt
+                               QSplashScreen, QLabel, QFrame, QHBoxLayout, QPushButton,
+                               QScrollArea)
+from PySide6.QtGui import QValidator, QDesktopServices, QScreen, QPixmap, QIcon, QAction, QActionGroup
+from PySide6.QtCore import QTimer, Slot, QCoreApplication, QUrl, QStandardPaths, QDir, Qt, QSize
 
 import sys
 import os
+import time
+import argparse
+import numpy as np
 
 # Importa le tue classi locali
 # Assicurati che questi import siano corretti rispetto alla struttura delle tue directory
@@ -17,6 +21,11 @@ from src.Functions import GuiFunctions  # Assicurati che Functions.py esista
 from src.custom_spinbox import CustomStepSpinBox
 # Assicurati che MenuFunctions.py esista
 from src.MenuFunctions import MenuFunctions
+from src.acquisition_backends import BACKENDS, create_backend
+from src.acquisition_worker import AcquisitionWorker
+from src.trigger_handler import SWEEP_MODES, TRIGGER_TYPES, TRIGGER_SOURCES
+from src.fft_engine import WINDOW_TYPES
+from src.welch import AVERAGING_MODES, PSD_UNITS
 
 # Assicurati che queste classi custom siano disponibili
 # Potresti dover aggiustare gli import a seconda di dove si trovano
@@ -40,7 +49,8 @@ except ImportError:
 class MainWindow(QMainWindow):
     REC_DUR = 1000
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, backend=None, memory_depth=None, display_fps=None,
+                 fft_len=None, fft_window=None):
         super().__init__(parent)
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
@@ -61,7 +71,9 @@ class MainWindow(QMainWindow):
         self.setup_logo()
 
         # Crea l'istanza di GuiFunctions
-        self.gui_functions = GuiFunctions(self)
+        self.gui_functions = GuiFunctions(self, backend=backend, memory_depth=memory_depth,
+                                          display_fps=display_fps, fft_len=fft_len,
+                                          fft_window=fft_window)
 
         # Configura i controlli personalizzati (questo sostituisce gli spinbox)
         self.setup_custom_controls()
@@ -72,6 +84,14 @@ class MainWindow(QMainWindow):
         self.gui_functions.connect_scale_controls()
         # ************************
 
+        # Livello, isteresi e holdoff del trigger
+        self.setup_trigger_controls()
+        self.gui_functions.connect_trigger_controls()
+
+        # Finestra, media e unità dello spettro (menu VIEW > Spectrum)
+        self.setup_spectrum_menu(fft_window or GuiFunctions.FFT_WINDOW)
+        self.gui_functions.connect_spectrum_controls()
+
         # Crea l'istanza di MenuFunctions, passando il riferimento aggiornato a gui_functions
         # Assicurati che MenuFunctions possa gestire l'inizializzazione successiva se necessario
         self.menu_functions = MenuFunctions(
@@ -79,7 +99,7 @@ class MainWindow(QMainWindow):
             self, gui_functions_ref=self.gui_functions)
 
         # Popola ComboBox FFT
-        fft_options = ["Time D.", "FFT"]
+        fft_options = ["Time D.", "FFT", "PSD", "Waterfall", "Persist."]
         if hasattr(self.ui, 'FFTcomb'):
             self.ui.FFTcomb.addItems(fft_options)
         if hasattr(self.ui, 'FFTcomb_2'):
@@ -95,7 +115,7 @@ class MainWindow(QMainWindow):
 
         # Connetti la sorgente dati alla funzione di raccolta dati (già corretta)
         if hasattr(self.gui_functions, 'signal_source') and self.gui_functions.signal_source:
-            self.gui_functions.signal_source.data_updated.connect(
+            self.gui_functions.signal_source.block_updated.connect(
                 self.collect_data_if_recording)
 
         # Close splash screen after 2 seconds and show main window
@@ -216,15 +236,231 @@ class MainWindow(QMainWindow):
         replace_and_setup('timediv_spbx', 'timediv_cb', 'selframe2', time_sequence,
                           time_units, GuiFunctions.DEFAULT_TIME_DIV_VALUE, "s")
 
-    @Slot(float, float)
-    def collect_data_if_recording(self, value1, value2):
+    def setup_trigger_controls(self):
+        """Adds trigger source / type / Level / Hysteresis / Holdoff / sweep mode / segmented memory rows under the edge checkboxes of the Trigger panel."""
+        if not (hasattr(self.ui, 'TriggerWid') and hasattr(self.ui, 'gridLayout_4')):
+            print("Warning: Trigger panel not found, trigger level controls not added.")
+            return
+
+        def add_row(row, label_text, spinbox, ui_name):
+            frame = QFrame(self.ui.TriggerWid)
+            frame.setMaximumSize(QSize(16777215, 40))
+            frame.setFrameShape(QFrame.Shape.StyledPanel)
+            frame.setFrameShadow(QFrame.Shadow.Raised)
+            layout = QHBoxLayout(frame)
+            layout.setContentsMargins(4, 2, 4, 2)
+            label = QLabel(label_text, frame)
+            label.setMaximumSize(QSize(100, 16777215))
+            layout.addWidget(label)
+            spinbox.setParent(frame)
+            spinbox.setMaximumWidth(80)
+            layout.addWidget(spinbox, 0, Qt.AlignmentFlag.AlignRight)
+            self.ui.gridLayout_4.addWidget(frame, row, 0, 1, 1)
+            setattr(self.ui, ui_name, spinbox)
+
+        # Canale su cui si cerca il trigger, condiviso da tutti i grafici
+        trigger_source = QComboBox()
+        trigger_source.addItems(TRIGGER_SOURCES)
+        add_row(6, "Source", trigger_source, 'TriggerSourcecb')
+
+        # Edge, larghezza d'impulso, runt, finestra, slew rate; la polarità viene
+        # dalle caselle Positive/Negative edge
+        trigger_type = QComboBox()
+        trigger_type.addItems(TRIGGER_TYPES)
+        add_row(7, "Type", trigger_type, 'TriggerTypecb')
+
+        level = QDoubleSpinBox()
+        level.setRange(-10.0, 10.0)
+        level.setDecimals(3)
+        level.setSingleStep(0.05)
+        add_row(8, "Level (V)", level, 'TriggerLevelspbx')
+
+        # Seconda soglia di Runt / Window / Slew (la banda è tra i due livelli)
+        upper_level = QDoubleSpinBox()
+        upper_level.setRange(-10.0, 10.0)
+        upper_level.setDecimals(3)
+        upper_level.setSingleStep(0.05)
+        upper_level.setValue(1.0)
+        add_row(9, "Level 2 (V)", upper_level, 'TriggerLevel2spbx')
+
+        width = QSpinBox()
+        width.setRange(1, 100_000_000)
+        width.setValue(10)
+        add_row(10, "Width (samples)", width, 'TriggerWidthspbx')
+
+        hysteresis = QDoubleSpinBox()
+        hysteresis.setRange(0.0, 5.0)
+        hysteresis.setDecimals(3)
+        hysteresis.setSingleStep(0.01)
+        add_row(11, "Hysteresis (V)", hysteresis, 'TriggerHystspbx')
+
+        holdoff = QSpinBox()
+        holdoff.setRange(0, 100_000_000)
+        holdoff.setSingleStep(100)
+        add_row(12, "Holdoff (samples)", holdoff, 'TriggerHoldoffspbx')
+
+        # Auto / Normal / Single / Stop; "Arm" riarma Single dopo una cattura
+        sweep_mode = QComboBox()
+        sweep_mode.addItems(SWEEP_MODES)
+        add_row(13, "Sweep", sweep_mode, 'SweepModecb')
+
+        arm = QPushButton("Arm")
+        add_row(14, "Single shot", arm, 'Armbtn')
+
+        # Memoria segmentata: N segmenti catturati di seguito, poi sfogliati sovrapposti
+        segment_count = QSpinBox()
+        segment_count.setRange(1, 100_000)
+        segment_count.setSingleStep(100)
+        segment_count.setValue(GuiFunctions.SEGMENT_COUNT)
+        add_row(15, "Segments", segment_count, 'SegmentCountspbx')
+
+        segment_len = QSpinBox()
+        segment_len.setRange(2, 100_000)
+        segment_len.setValue(GuiFunctions.SEGMENT_LEN)
+        add_row(16, "Seg. length", segment_len, 'SegmentLenspbx')
+
+        capture = QPushButton("Capture")
+        add_row(17, "Segmented", capture, 'SegCapturebtn')
+
+        segment_view = QSpinBox()
+        segment_view.setRange(0, 0)
+        segment_view.setSpecialValueText("Live")
+        add_row(18, "View segment", segment_view, 'SegmentViewspbx')
+
+        # Con tutte le righe il pannello è più alto della finestra: invece di
+        # schiacciare le righe, lo si mette in un'area che scorre in verticale
+        self.ui.TriggerWid.setFixedSize(180, self.ui.gridLayout_4.sizeHint().height())
+        scroll = QScrollArea(self.ui.GraphWid)
+        scroll.setFrameShape(QFrame.Shape.NoFrame)
+        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        scroll.setMinimumSize(QSize(200, 150))
+        scroll.setMaximumWidth(200)
+        self.ui.verticalLayout.replaceWidget(self.ui.TriggerWid, scroll)
+        scroll.setWidget(self.ui.TriggerWid)
+        self.ui.TriggerScroll = scroll
+
+    def setup_spectrum_menu(self, fft_window):
+        """Adds VIEW > Spectrum: FFT/PSD window, Welch averaging, overlap, segment length, units and max/min hold."""
+        if not hasattr(self.ui, 'menuVIEW'):
+            print("Warning: menuVIEW not found, spectrum menu not added.")
+            return
+        spectrum_menu = self.ui.menuVIEW.addMenu("Spectrum")
+
+        def add_choices(title, choices, checked, ui_name):
+            # Sottomenu di scelte esclusive; data() porta il valore numerico, se c'è
+            menu = spectrum_menu.addMenu(title)
+            group = QActionGroup(self)
+            group.setExclusive(True)
+            for text, value in choices:
+                action = QAction(text, self)
+                action.setCheckable(True)
+                action.setData(value)
+                action.setChecked(text == checked)
+                group.addAction(action)
+                menu.addAction(action)
+            setattr(self.ui, ui_name, group)
+
+        add_choices("Window", [(w, None) for w in WINDOW_TYPES], fft_window, 'FFTWindowGroup')
+        spectrum_menu.addSeparator()
+        add_choices("PSD averaging", [(m, None) for m in AVERAGING_MODES], "Exponential", 'PSDAveragingGroup')
+        add_choices("PSD averages", [(str(n), n) for n in (4, 8, 16, 32, 64)], "16", 'PSDAveragesGroup')
+        add_choices("PSD overlap", [(f"{p}%", p / 100) for p in (0, 25, 50, 75)], "50%", 'PSDOverlapGroup')
+        add_choices("PSD segment", [(str(n), n) for n in (128, 256, 512, 1024, 2048)], "256",
+                    'PSDSegmentGroup')
+        add_choices("PSD units", [(u, None) for u in PSD_UNITS], PSD_UNITS[0], 'PSDUnitsGroup')
+        spectrum_menu.addSeparator()
+
+        for text, ui_name in (("Max hold", 'actionMax_hold'), ("Min hold", 'actionMin_hold')):
+            action = QAction(text, self)
+            action.setCheckable(True)
+            spectrum_menu.addAction(action)
+            setattr(self.ui, ui_name, action)
+        restart = QAction("Restart averaging", self)
+        spectrum_menu.addAction(restart)
+        self.ui.actionRestart_averaging = restart
+
+    @Slot(np.ndarray)
+    def collect_data_if_recording(self, block):
         if self.is_recording:
-            self.recorded_data.append((value1, value2))
-
-    def closeEvent(self, event): super().closeEvent(event)
+            self.recorded_data.extend(block.tolist())
+
+    def closeEvent(self, event):
+        if hasattr(self, 'gui_functions'):
+            self.gui_functions.render_scheduler.stop()
+            if self.gui_functions.signal_source:
+                self.gui_functions.signal_source.stop()
+        super().closeEvent(event)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="SignaLab - TrueSignal oscilloscope")
+    parser.add_argument("--source", choices=sorted(BACKENDS), default="sim",
+                        help="Acquisition backend (default: sim)")
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="Sampling rate in Hz (default: 1000)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for the simulated source")
+    parser.add_argument("--file", help="Capture to replay with --source replay (.txt or .npy)")
+    parser.add_argument("--no-loop", action="store_true",
+                        help="Stop at the end of the replay file instead of looping")
+    parser.add_argument("--port", help="Serial port of the TrueSignal device with --source serial")
+    parser.add_argument("--baud", type=int, default=2000000, help="Serial baud rate")
+    parser.add_argument("--depth", type=int, default=GuiFunctions.MEMORY_DEPTH,
+                        help="Acquisition memory per channel in samples (default: %(default)s)")
+    parser.add_argument("--fps", type=float, default=GuiFunctions.DISPLAY_FPS,
+                        help="Display refresh rate of the plots (default: %(default)s)")
+    parser.add_argument("--fft-len", type=int, default=None,
+                        help="FFT points; more than the %d-sample record zero-pads it (default: record length)"
+                             % GuiFunctions.BUFFER_SIZE)
+    parser.add_argument("--fft-window", choices=WINDOW_TYPES, default=GuiFunctions.FFT_WINDOW,
+                        help="FFT window (default: %(default)s)")
+    parser.add_argument("--headless", type=float, metavar="SECONDS", default=None,
+                        help="Run acquisition without GUI for SECONDS and print the counters")
+    # Gli argomenti non riconosciuti restano a Qt
+    return parser.parse_known_args(argv)
+
+
+def backend_from_args(args):
+    if args.source == "replay":
+        if not args.file:
+            raise SystemExit("--source replay requires --file")
+        return create_backend("replay", file_path=args.file, sampling_rate_hz=args.rate,
+                              loop=not args.no_loop)
+    if args.source == "serial":
+        if not args.port:
+            raise SystemExit("--source serial requires --port")
+        return create_backend("serial", port=args.port, sampling_rate_hz=args.rate,
+                              baudrate=args.baud)
+    return create_backend("sim", sampling_rate_hz=args.rate, seed=args.seed)
+
+
+def run_headless(backend, duration_s, fft_len=None, fft_window="Hann"):
+    """Acquire for duration_s seconds without Qt and print the sample counters (for CI)."""
+    worker = AcquisitionWorker(backend, block_size=max(1, int(backend.sampling_rate_hz // 100)),
+                               fft_size=GuiFunctions.BUFFER_SIZE, fft_len=fft_len,
+                               fft_window=fft_window)
+    worker.start()
+    end = time.monotonic() + duration_s
+    try:
+        while time.monotonic() < end:
+            time.sleep(0.033)
+            worker.drain()
+            worker.take_fft()
+    finally:
+        worker.stop()
+    worker.drain()
+    stats = worker.stats()
+    print(f"Headless run ({backend.name}): produced={stats['produced']} "
+          f"consumed={stats['consumed']} dropped={stats['dropped']}")
+    return 0 if stats['dropped'] == 0 else 1
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    args, qt_args = parse_args(sys.argv[1:])
+    backend = backend_from_args(args)
+    if args.headless is not None:
+        sys.exit(run_headless(backend, args.headless, args.fft_len, args.fft_window))
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(backend=backend, memory_depth=args.depth, display_fps=args.fps,
+                        fft_len=args.fft_len, fft_window=args.fft_window)
     sys.exit(app.exec())
@@ -1,139 +1,113 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget
 # Assicurati che OscilloscopeWidget esista e contenga le classi corrette
-from src.OscilloscopeWidget import Oscilloscope, CombinedOscilloscope, Signal1Oscilloscope, Signal2Oscilloscope
-from PySide6.QtCore import Slot, QObject, QTimer, Signal
+from src.OscilloscopeWidget import (Oscilloscope, CombinedOscilloscope, Signal1Oscilloscope,
+                                    Signal2Oscilloscope, TIME_MODES, SPECTRUM_MODES)
+from PySide6.QtCore import Slot, QObject, QTimer, Signal, SIGNAL
 import numpy as np
+from src.data_hub import DataHub
+from src.minmax_pyramid import MinMaxPyramid
+from src.acquisition_backends import AcquisitionBackend, SimulatedBackend
+from src.acquisition_worker import AcquisitionWorker
+from src.render_scheduler import RenderScheduler
+from src.scale_model import ScaleModel
+from src.segmented_capture import SegmentedCapture
+from src.trigger_handler import TriggerHandler, TRIGGER_SOURCES, source_samples
+from src.welch import PSD_UNITS, psd_in_units
 
 
 class SignalSource(QObject):
-    data_updated = Signal(float, float)
+    data_updated = Signal(float, float)  # Compatibilità: un segnale per campione
+    block_updated = Signal(np.ndarray)   # Blocco (N, 2) di campioni per ogni poll
     fft_data_updated = Signal(np.ndarray, np.ndarray, np.ndarray)
+    psd_data_updated = Signal(np.ndarray, np.ndarray)  # Frequenze, tracce (3, canali, bin) in psd_units
 
-    def __init__(self, buffer_size, update_interval_ms=1, fft_update_interval_ms=100, parent=None):
+    CHANNELS = AcquisitionBackend.channels
+    ANALYSES = ("FFT", "PSD") # Analisi in frequenza a cui ci si può abbonare, vedi subscribe()
+
+    def __init__(self, buffer_size, update_interval_ms=1, fft_update_interval_ms=100,
+                 samples_per_block=1, seed=None, poll_interval_ms=33, backend=None,
+                 memory_depth=None, fft_len=None, fft_window="Hann", parent=None):
         super().__init__(parent)
         if buffer_size <= 0:
             raise ValueError("Buffer size must be positive.")
+        if samples_per_block <= 0:
+            raise ValueError("Samples per block must be positive.")
         self.buffer_size = buffer_size
         self.update_interval_ms = update_interval_ms
-        self.sampling_rate_hz = 1000.0 / self.update_interval_ms if self.update_interval_ms > 0 else 1000.0
-
-        # Signal 1 parameters (Smooth Random Walk)
-        self.signal1_params = {
-            'step_size': 0.1,        # Size of random steps (σ of normal distribution)
-            'noise_level': 0.05,     # Additional noise level
-            'max_amplitude': 5.0,     # Maximum absolute amplitude
-            'baseline_drift': 0.01    # Slow drift in the baseline
-        }
-        
-        # Signal 2 parameters (Chaotic with Spikes)
-        self.signal2_params = {
-            'step_size': 0.2,        # Size of random steps
-            'noise_level': 0.1,      # Additional noise level
-            'max_amplitude': 3.0,     # Maximum amplitude (excluding spikes)
-            'spike_probability': 0.02,# Probability of spikes (2%)
-            'spike_amplitude': 4.0,   # Amplitude of spikes
-            'spike_noise': 0.5,      # Noise added to spikes
-            'burst_mode': False,     # Whether to generate burst of spikes
-            'burst_duration': 50,     # Duration of burst in samples
-            'burst_interval': 500     # Minimum samples between bursts
-        }
-
-        # Initialize signal states
-        self.last_value1 = 0.0
-        self.last_value2 = 0.0
-        self.baseline_drift = 0.0
-        self.burst_counter = 0
-        self.samples_since_last_burst = 0
-
-        # Buffer initialization
-        self.y1_buffer = np.zeros(self.buffer_size, dtype=np.float64)
-        self.y2_buffer = np.zeros(self.buffer_size, dtype=np.float64)
-        self.ptr = 0
-
-        # FFT setup
-        self.fft_len = self.buffer_size // 2
-        self.x_freq_hz = np.fft.rfftfreq(self.buffer_size, d=1.0/self.sampling_rate_hz)[:self.fft_len]
-        self.fft_mag1 = np.zeros(self.fft_len, dtype=np.float64)
-        self.fft_mag2 = np.zeros(self.fft_len, dtype=np.float64)
-
-        # Timers setup
-        self.data_timer = QTimer(self)
-        self.data_timer.timeout.connect(self.update_signals_and_emit_data)
-        self.data_timer.start(self.update_interval_ms)
-
-        self.fft_timer = QTimer(self)
-        self.fft_timer.timeout.connect(self.calculate_fft_and_emit)
-        self.fft_timer.start(fft_update_interval_ms)
+        self.samples_per_block = samples_per_block
+        if backend is None:
+            # Default: sorgente simulata a samples_per_block campioni ogni update_interval_ms
+            tick_rate_hz = 1000.0 / self.update_interval_ms if self.update_interval_ms > 0 else 1000.0
+            backend = SimulatedBackend(tick_rate_hz * self.samples_per_block, seed=seed)
+        self.backend = backend
+        self.sampling_rate_hz = self.backend.sampling_rate_hz
+
+        # I parametri dei segnali esistono solo per la sorgente simulata
+        self.generator = getattr(self.backend, 'generator', None)
+        self.signal1_params = self.generator.signal1_params if self.generator else {}
+        self.signal2_params = self.generator.signal2_params if self.generator else {}
+
+        # Memoria di acquisizione profonda, unica e condivisa in sola lettura da tutti
+        # i widget, più la piramide min/max usata per disegnare qualsiasi Time/Div
+        self.memory_depth = max(memory_depth or self.buffer_size, self.buffer_size)
+        self.hub = DataHub(self.CHANNELS, self.memory_depth, dtype=np.float32)
+        self.pyramid = MinMaxPyramid(self.hub)
+
+        # Acquisizione e FFT girano in un thread dedicato; il thread GUI
+        # raccoglie solo i dati accumulati, alla frequenza del display.
+        # La FFT usa gli ultimi buffer_size campioni, su fft_len punti (None = buffer_size)
+        self.worker = AcquisitionWorker(
+            self.backend,
+            block_size=self.samples_per_block,
+            fft_size=self.buffer_size,
+            fft_interval_s=fft_update_interval_ms / 1000.0,
+            fft_len=fft_len,
+            fft_window=fft_window)
+
+        # Spettri ricevuti dal worker, copiati sempre nello stesso array (canali, bin)
+        self.fft_interval_s = self.worker.fft_interval_s
+        self.fft_len = self.worker.fft.n_bins
+        self.x_freq_hz = self.worker.fft.freqs
+        self.fft_mags = np.zeros((self.CHANNELS, self.fft_len), dtype=np.float64)
+        self.fft_mag1, self.fft_mag2 = self.fft_mags
+
+        # Abbonati di ogni analisi: slot -> canali richiesti. Il worker calcola solo
+        # l'unione dei canali richiesti e i segnali raggiungono solo gli abbonati
+        self._subscriptions = {analysis: {} for analysis in self.ANALYSES}
+        self.worker.set_fft_channels(())
+
+        # PSD di Welch (media, max hold, min hold) calcolata dal worker solo se richiesta
+        self.psd_units = PSD_UNITS[0]
+        self._psd_raw = None
+        self._psd_freq_hz = None
+        self._psd_enbw_hz = 1.0
+        self.psd_traces = None
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll_worker)
+        self.poll_timer.start(poll_interval_ms)
+        self.worker.start()
+
+    @Slot()
+    def poll_worker(self):
+        self.update_signals_and_emit_data()
+        self.calculate_fft_and_emit()
+        self.calculate_psd_and_emit()
 
     def update_signals_and_emit_data(self):
-        # Generate Signal 1 (Smooth Random Walk with drift)
-        # Update baseline drift
-        self.baseline_drift += np.random.normal(0, self.signal1_params['baseline_drift'])
-        self.baseline_drift = np.clip(self.baseline_drift, -1, 1)
-        
-        # Generate main signal
-        random_step1 = np.random.normal(0, self.signal1_params['step_size'])
-        self.last_value1 += random_step1
-        self.last_value1 = np.clip(
-            self.last_value1, 
-            -self.signal1_params['max_amplitude'], 
-            self.signal1_params['max_amplitude']
-        )
-        
-        # Add noise and drift
-        current_val1 = (
-            self.last_value1 + 
-            np.random.normal(0, self.signal1_params['noise_level']) +
-            self.baseline_drift
-        )
-        
-        # Generate Signal 2 (Chaotic with Spikes or Bursts)
-        if self.signal2_params['burst_mode']:
-            # Burst mode logic
-            if self.burst_counter > 0:
-                # In burst
-                current_val2 = np.random.choice([-1, 1]) * self.signal2_params['spike_amplitude']
-                current_val2 += np.random.normal(0, self.signal2_params['spike_noise'])
-                self.burst_counter -= 1
-                self.samples_since_last_burst = 0
-            else:
-                # Not in burst
-                self.samples_since_last_burst += 1
-                if (self.samples_since_last_burst >= self.signal2_params['burst_interval'] and 
-                    np.random.random() < self.signal2_params['spike_probability']):
-                    # Start new burst
-                    self.burst_counter = self.signal2_params['burst_duration']
-                    current_val2 = np.random.choice([-1, 1]) * self.signal2_params['spike_amplitude']
-                else:
-                    # Normal random walk
-                    random_step2 = np.random.normal(0, self.signal2_params['step_size'])
-                    self.last_value2 += random_step2
-                    self.last_value2 = np.clip(
-                        self.last_value2,
-                        -self.signal2_params['max_amplitude'],
-                        self.signal2_params['max_amplitude']
-                    )
-                    current_val2 = self.last_value2 + np.random.normal(0, self.signal2_params['noise_level'])
-        else:
-            # Regular spike mode
-            if np.random.random() < self.signal2_params['spike_probability']:
-                current_val2 = np.random.choice([-1, 1]) * self.signal2_params['spike_amplitude']
-                current_val2 += np.random.normal(0, self.signal2_params['spike_noise'])
-            else:
-                random_step2 = np.random.normal(0, self.signal2_params['step_size'])
-                self.last_value2 += random_step2
-                self.last_value2 = np.clip(
-                    self.last_value2,
-                    -self.signal2_params['max_amplitude'],
-                    self.signal2_params['max_amplitude']
-                )
-                current_val2 = self.last_value2 + np.random.normal(0, self.signal2_params['noise_level'])
-        
-        # Update buffers and emit
-        self.y1_buffer[self.ptr] = current_val1
-        self.y2_buffer[self.ptr] = current_val2
-        self.ptr = (self.ptr + 1) % self.buffer_size
-        self.data_updated.emit(current_val1, current_val2)
+        block = self.worker.drain()
+        if block is None:
+            return
+
+        # Update the shared hub and emit one block per poll
+        self.hub.write(block)
+        self.pyramid.update()
+        self.block_updated.emit(block)
+
+        # Shim per-campione: emesso solo se qualcuno è ancora connesso a data_updated
+        if self.receivers(SIGNAL("data_updated(double,double)")) > 0:
+            for value1, value2 in block:
+                self.data_updated.emit(float(value1), float(value2))
 
     def set_signal1_params(self, **params):
         """Update Signal 1 parameters"""
@@ -148,43 +122,136 @@ class SignalSource(QObject):
         self.signal2_params['burst_mode'] = enabled
 
     def calculate_fft_and_emit(self):
-        if self.buffer_size > 0:
-            y1_snapshot = np.copy(self.y1_buffer)
-            y2_snapshot = np.copy(self.y2_buffer)
-            window = np.hanning(self.buffer_size) # Applica finestra per FFT
-            fft_coeffs1 = np.fft.rfft(y1_snapshot * window)
-            fft_coeffs2 = np.fft.rfft(y2_snapshot * window)
-            self.fft_mag1 = np.abs(fft_coeffs1[:self.fft_len])
-            self.fft_mag2 = np.abs(fft_coeffs2[:self.fft_len])
-            self.fft_data_updated.emit(
-                self.x_freq_hz, self.fft_mag1, self.fft_mag2)
+        # La FFT è calcolata dal worker; qui si inoltra solo il risultato più recente
+        if self.worker.take_fft(out=self.fft_mags) is None:
+            return
+        self.fft_data_updated.emit(
+            self.x_freq_hz, self.fft_mag1, self.fft_mag2)
+
+    def calculate_psd_and_emit(self):
+        # Tracce in V²/Hz dal worker, convertite nelle unità scelte in array riusati
+        result = self.worker.take_psd(out=self._psd_raw)
+        if result is None:
+            return
+        self._psd_freq_hz, self._psd_raw, self._psd_enbw_hz = result
+        self._emit_psd()
+
+    def _emit_psd(self):
+        if self.psd_traces is None or self.psd_traces.shape != self._psd_raw.shape:
+            self.psd_traces = np.empty_like(self._psd_raw)
+        psd_in_units(self._psd_raw, self.psd_units, self._psd_enbw_hz, out=self.psd_traces)
+        self.psd_data_updated.emit(self._psd_freq_hz, self.psd_traces)
+
+    def subscribe(self, slot, analysis, channels):
+        """Connect slot to the analysis ("FFT" or "PSD") of channels; no channels disconnects it.
+
+        "FFT" slots receive fft_data_updated, "PSD" slots psd_data_updated.
+        The worker computes the FFT only for the channels someone subscribed
+        to, and the Welch PSD only while it has a subscriber (always for
+        every channel, its averages must not restart when a plot is added).
+        """
+        if analysis not in self.ANALYSES:
+            raise ValueError(f"Unknown analysis: {analysis}. Choose from {self.ANALYSES}.")
+        signal = self.fft_data_updated if analysis == "FFT" else self.psd_data_updated
+        subscribers = self._subscriptions[analysis]
+        channels = frozenset(channels)
+        if channels and slot not in subscribers:
+            signal.connect(slot)
+        elif not channels and slot in subscribers:
+            signal.disconnect(slot)
+        if channels:
+            subscribers[slot] = channels
         else:
-            empty_arr = np.array([], dtype=np.float64)
-            self.fft_data_updated.emit(empty_arr, empty_arr, empty_arr)
+            subscribers.pop(slot, None)
+
+        demand = frozenset().union(*subscribers.values())
+        if analysis == "FFT":
+            self.worker.set_fft_channels(demand)
+        else:
+            self.worker.set_psd_enabled(bool(demand))
+
+    def configure_psd(self, **settings):
+        """Welch segment length, overlap, averaging and number of averages (see WelchPSD)."""
+        self.worker.configure_psd(**settings)
+
+    def set_psd_units(self, units):
+        if units not in PSD_UNITS:
+            raise ValueError(f"Unknown PSD units: {units}. Choose from {PSD_UNITS}.")
+        self.psd_units = units
+        # Le ultime tracce ricevute vengono subito riconvertite, senza attendere il worker
+        if self._psd_raw is not None:
+            self._emit_psd()
+
+    def set_fft_window(self, window):
+        """FFT window, one of fft_engine.WINDOW_TYPES."""
+        self.worker.set_fft_window(window)
+
+    def acquisition_stats(self):
+        """Samples produced by the worker vs. consumed by the GUI."""
+        return self.worker.stats()
+
+    def stop(self):
+        self.poll_timer.stop()
+        self.worker.stop()
 
 
 class GuiFunctions(QObject):
     voltage_scale_changed = Signal()
     time_scale_changed = Signal()
 
-    BUFFER_SIZE = 1024
+    BUFFER_SIZE = 1024 # Campioni per FFT e per il frame del trigger
+    MEMORY_DEPTH = 1_000_000 # Memoria di acquisizione per canale (configurabile)
+    DISPLAY_FPS = 30.0 # Frequenza di ridisegno dei grafici
+    FFT_WINDOW = "Hann" # Finestra dello spettro, vedi fft_engine.WINDOW_TYPES
+    AUTO_TRIGGER_TIMEOUT_S = 0.1 # In Auto, sweep libero dopo questo tempo senza trigger
+    SEGMENT_COUNT = 1000 # Segmenti per cattura in memoria segmentata
+    SEGMENT_LEN = 64 # Campioni per segmento, trigger al centro
+    SEGMENT_CHANNEL = 1 # Canale 2 (spike)
     DEFAULT_VOLT_DIV_VALUE = 1.0
     DEFAULT_VOLT_DIV_UNIT_INDEX = 0 # Indice per "V" in ["V", "mV", "uV"]
     DEFAULT_TIME_DIV_VALUE = 1.0
     DEFAULT_TIME_DIV_UNIT_INDEX = 0 # Indice per "s" in ["s", "ms", "us"]
 
 
-    def __init__(self, Mainwindow):
+    def __init__(self, Mainwindow, backend=None, memory_depth=None, display_fps=None,
+                 fft_len=None, fft_window=None):
         super().__init__()
         self.main = Mainwindow
         self.ui = Mainwindow.ui # Riferimento all'UI della MainWindow
 
+        # backend=None usa la sorgente simulata; vedi create_backend in acquisition_backends
+        # Un blocco ogni 10 ms a qualunque frequenza di campionamento, come in run_headless
+        # (blocchi da 10 campioni non reggono frequenze di centinaia di kS/s)
+        rate_hz = backend.sampling_rate_hz if backend is not None else 1000.0
         self.signal_source = SignalSource(
             buffer_size=self.BUFFER_SIZE,
-            update_interval_ms=1, # Velocità di generazione dati (1ms = 1kHz)
-            fft_update_interval_ms=100 # Frequenza di ricalcolo FFT
+            update_interval_ms=10, # Un blocco ogni 10 ms
+            samples_per_block=max(1, int(rate_hz // 100)), # 10 campioni per blocco a 1kHz
+            fft_update_interval_ms=100, # Frequenza di ricalcolo FFT
+            backend=backend,
+            memory_depth=memory_depth or self.MEMORY_DEPTH,
+            fft_len=fft_len, # Punti della FFT (None = BUFFER_SIZE, di più = zero padding)
+            fft_window=fft_window or self.FFT_WINDOW
         )
         self.oscilloscope_widgets = [] # Lista per tenere traccia di tutti i widget oscilloscopio
+        # Un solo trigger per tutti i grafici: ogni blocco viene scandito una volta,
+        # sulla sola sorgente scelta, e gli altri canali sono allineati per indice
+        self.trigger_source = TRIGGER_SOURCES[0]
+        self.trigger_handler = TriggerHandler(self.BUFFER_SIZE)
+        # Tracce di max/min hold mostrate sopra la media della PSD
+        self.psd_max_hold = False
+        self.psd_min_hold = False
+        self.signal_source.block_updated.connect(self.on_new_trigger_block)
+        # Memoria segmentata: ha un proprio TriggerHandler e scrive direttamente dall'hub
+        self.segmented_capture = SegmentedCapture(
+            self.signal_source.hub, TriggerHandler(self.BUFFER_SIZE),
+            self.signal_source.sampling_rate_hz, self)
+        self.signal_source.block_updated.connect(self.segmented_capture.on_new_block)
+        self.segmented_capture.capture_finished.connect(self.on_segment_capture_finished)
+        # Scale Volt/Div e Time/Div risolte una volta sola, lette dai grafici a ogni frame
+        self.scale = ScaleModel(self.DEFAULT_VOLT_DIV_VALUE, "V", self.DEFAULT_TIME_DIV_VALUE, "s")
+        # Un solo clock di visualizzazione: ridisegna solo i grafici visibili
+        self.render_scheduler = RenderScheduler(display_fps or self.DISPLAY_FPS, self)
 
         # Crea le istanze dei widget oscilloscopio e aggiungili ai tab
         # NOTA: Questi widget vengono creati prima che i controlli di scala personalizzati
@@ -211,13 +278,12 @@ class GuiFunctions(QObject):
         # Chiama per impostare la modalità iniziale dei grafici
         self._update_display_modes()
 
-        # Connetti il cambio di tab per gestire i timer dei grafici
+        # Al cambio di tab il nuovo grafico visibile viene ridisegnato subito
         if hasattr(self.ui, 'tabWidget') and isinstance(self.ui.tabWidget, QTabWidget):
             self.ui.tabWidget.currentChanged.connect(self.on_tab_changed)
-            # Triggera l'evento di cambio tab iniziale per avviare il timer del tab 1
-            self.on_tab_changed(self.ui.tabWidget.currentIndex())
         else:
             print("Warning: tabWidget not found or not a QTabWidget in UI.")
+        self.render_scheduler.start()
 
         # ***** MODIFICA QUI *****
         # NON CONNETTERE I CONTROLLI DI SCALA QUI!
@@ -259,10 +325,13 @@ class GuiFunctions(QObject):
         else:
              print("Warning: timediv_cb not found for connecting currentIndexChanged.")
 
+        # Allinea il modello di scala ai controlli appena installati
+        self._read_voltage_controls()
+        self._read_time_controls()
+
         # Connetti i segnali di cambio scala a *tutti* gli oscilloscopi
         # Indipendentemente dal tab attivo, gli aggiornamenti della scala devono arrivare
-        # a tutti, ma solo i grafici nel tab attivo si ridisegneranno effettivamente
-        # grazie alla logica di on_tab_changed e display_timer.
+        # a tutti, ma solo i grafici visibili vengono ridisegnati dal RenderScheduler.
         for osc in self.oscilloscope_widgets:
              if hasattr(osc, 'update_voltage_scale'):
                 self.voltage_scale_changed.connect(osc.update_voltage_scale)
@@ -279,8 +348,9 @@ class GuiFunctions(QObject):
         # Le connessioni vengono fatte separatamente in connect_scale_controls DOPO che MainWindow
         # ha finito di impostare i custom spinbox.
         if osc_widget_instance:
-            if hasattr(osc_widget_instance, 'display_timer'):
+            if hasattr(osc_widget_instance, 'update_display'):
                 self.oscilloscope_widgets.append(osc_widget_instance)
+                self.render_scheduler.register(osc_widget_instance)
             # RIMOSSO: Connessioni scale_changed spostate in connect_scale_controls
             # if hasattr(osc_widget_instance, 'update_voltage_scale'):
             #     self.voltage_scale_changed.connect(
@@ -367,79 +437,271 @@ class GuiFunctions(QObject):
         layout.addWidget(self.signal2_osc_tab4)
 
 
+    def trigger_handlers(self):
+        """TriggerHandler instances driving the oscilloscope widgets (one, shared by all)."""
+        return [self.trigger_handler]
+
+    @Slot(np.ndarray)
+    def on_new_trigger_block(self, block):
+        # I campioni sono già nell'hub; con tutti i grafici in FFT non serve scandire
+        if any(osc.display_mode in TIME_MODES for osc in self.oscilloscope_widgets):
+            start_index = self.signal_source.hub.write_index - block.shape[0]
+            self.trigger_handler.process_block(source_samples(block, self.trigger_source), start_index)
+
+    def connect_trigger_controls(self):
+        # I controlli sono creati da MainWindow.setup_trigger_controls()
+        if hasattr(self.ui, 'PositiveEdgech'):
+            self.ui.PositiveEdgech.stateChanged.connect(self.on_pos_edge_trigger_changed)
+        if hasattr(self.ui, 'NegativeEdgech'):
+            self.ui.NegativeEdgech.stateChanged.connect(self.on_neg_edge_trigger_changed)
+        if hasattr(self.ui, 'TriggerSourcecb'):
+            self.ui.TriggerSourcecb.currentTextChanged.connect(self.on_trigger_source_changed)
+        for name in ('TriggerLevelspbx', 'TriggerLevel2spbx', 'TriggerWidthspbx',
+                     'TriggerHystspbx', 'TriggerHoldoffspbx'):
+            if hasattr(self.ui, name):
+                getattr(self.ui, name).valueChanged.connect(self.on_trigger_setting_changed)
+            else:
+                print(f"Warning: {name} not found for connecting valueChanged.")
+        if hasattr(self.ui, 'TriggerTypecb'):
+            self.ui.TriggerTypecb.currentTextChanged.connect(self.on_trigger_type_changed)
+        if hasattr(self.ui, 'SweepModecb'):
+            self.ui.SweepModecb.currentTextChanged.connect(self.on_sweep_mode_changed)
+        if hasattr(self.ui, 'Armbtn'):
+            self.ui.Armbtn.clicked.connect(self.on_arm_clicked)
+        if hasattr(self.ui, 'SegCapturebtn'):
+            self.ui.SegCapturebtn.clicked.connect(self.on_segment_capture_clicked)
+        if hasattr(self.ui, 'SegmentViewspbx'):
+            self.ui.SegmentViewspbx.valueChanged.connect(self.on_segment_view_changed)
+        self.on_trigger_setting_changed()
+
+    def connect_spectrum_controls(self):
+        # Le azioni sono create da MainWindow.setup_spectrum_menu()
+        groups = (('FFTWindowGroup', self.on_fft_window_changed),
+                  ('PSDAveragingGroup', self.on_psd_setting_changed),
+                  ('PSDAveragesGroup', self.on_psd_setting_changed),
+                  ('PSDOverlapGroup', self.on_psd_setting_changed),
+                  ('PSDSegmentGroup', self.on_psd_setting_changed),
+                  ('PSDUnitsGroup', self.on_psd_units_changed))
+        for name, slot in groups:
+            if hasattr(self.ui, name):
+                getattr(self.ui, name).triggered.connect(slot)
+            else:
+                print(f"Warning: {name} not found for connecting triggered.")
+        if hasattr(self.ui, 'actionMax_hold'):
+            self.ui.actionMax_hold.toggled.connect(self.on_psd_hold_changed)
+        if hasattr(self.ui, 'actionMin_hold'):
+            self.ui.actionMin_hold.toggled.connect(self.on_psd_hold_changed)
+        if hasattr(self.ui, 'actionRestart_averaging'):
+            self.ui.actionRestart_averaging.triggered.connect(self.on_psd_restart)
+        self.on_psd_setting_changed()
+
+    @Slot()
+    def on_fft_window_changed(self):
+        # La stessa finestra vale per la FFT e per i segmenti della PSD
+        self.signal_source.set_fft_window(self.ui.FFTWindowGroup.checkedAction().text())
+
+    @Slot()
+    def on_psd_setting_changed(self):
+        settings = {}
+        if hasattr(self.ui, 'PSDAveragingGroup'):
+            settings['averaging'] = self.ui.PSDAveragingGroup.checkedAction().text()
+        if hasattr(self.ui, 'PSDAveragesGroup'):
+            settings['n_averages'] = self.ui.PSDAveragesGroup.checkedAction().data()
+        if hasattr(self.ui, 'PSDOverlapGroup'):
+            settings['overlap'] = self.ui.PSDOverlapGroup.checkedAction().data()
+        if hasattr(self.ui, 'PSDSegmentGroup'):
+            settings['segment_len'] = self.ui.PSDSegmentGroup.checkedAction().data()
+        self.signal_source.configure_psd(**settings)
+
+    @Slot()
+    def on_psd_units_changed(self):
+        self.signal_source.set_psd_units(self.ui.PSDUnitsGroup.checkedAction().text())
+        # Asse logaritmico solo in V²/Hz: i grafici in PSD rifanno gli assi
+        for osc in self.oscilloscope_widgets:
+            if osc.display_mode == "PSD":
+                osc.reset_view()
+
+    @Slot()
+    def on_psd_hold_changed(self):
+        self.psd_max_hold = hasattr(self.ui, 'actionMax_hold') and self.ui.actionMax_hold.isChecked()
+        self.psd_min_hold = hasattr(self.ui, 'actionMin_hold') and self.ui.actionMin_hold.isChecked()
+        self.render_scheduler.request_frame()
+
+    @Slot()
+    def on_psd_restart(self):
+        # Senza argomenti configure_psd azzera solo media e hold
+        self.signal_source.configure_psd()
+
+    @Slot()
+    def on_trigger_setting_changed(self):
+        level = self.ui.TriggerLevelspbx.value() if hasattr(self.ui, 'TriggerLevelspbx') else 0.0
+        upper_level = self.ui.TriggerLevel2spbx.value() if hasattr(self.ui, 'TriggerLevel2spbx') else 1.0
+        width = self.ui.TriggerWidthspbx.value() if hasattr(self.ui, 'TriggerWidthspbx') else 10
+        hysteresis = self.ui.TriggerHystspbx.value() if hasattr(self.ui, 'TriggerHystspbx') else 0.0
+        holdoff = self.ui.TriggerHoldoffspbx.value() if hasattr(self.ui, 'TriggerHoldoffspbx') else 0
+        auto_timeout = max(self.BUFFER_SIZE,
+                           int(self.signal_source.sampling_rate_hz * self.AUTO_TRIGGER_TIMEOUT_S))
+        for handler in self.trigger_handlers() + [self.segmented_capture.handler]:
+            handler.set_level(level)
+            handler.set_upper_level(upper_level)
+            handler.set_width(width)
+            handler.set_hysteresis(hysteresis)
+            handler.set_holdoff(holdoff)
+            handler.set_auto_timeout(auto_timeout)
+
+    @Slot(int)
+    def on_pos_edge_trigger_changed(self, state):
+        self.trigger_handler.set_pos_edge_enabled(state == 2)
+        if state == 0:
+            self.trigger_handler.unfreeze()
+
+    @Slot(int)
+    def on_neg_edge_trigger_changed(self, state):
+        self.trigger_handler.set_neg_edge_enabled(state == 2)
+        if state == 0:
+            self.trigger_handler.unfreeze()
+
+    @Slot(str)
+    def on_trigger_source_changed(self, source):
+        if source not in TRIGGER_SOURCES:
+            print(f"Warning: unknown trigger source {source}")
+            return
+        self.trigger_source = source
+        # Fronti e run in corso appartenevano all'altra sorgente
+        self.trigger_handler.unfreeze()
+
+    @Slot(str)
+    def on_trigger_type_changed(self, trigger_type):
+        for handler in self.trigger_handlers() + [self.segmented_capture.handler]:
+            handler.set_trigger_type(trigger_type)
+
+    @Slot(str)
+    def on_sweep_mode_changed(self, mode):
+        for handler in self.trigger_handlers():
+            handler.set_sweep_mode(mode)
+
+    @Slot()
+    def on_arm_clicked(self):
+        for handler in self.trigger_handlers():
+            handler.rearm()
+
+    def _segment_widgets(self):
+        # Grafici a canale singolo che mostrano il canale della cattura segmentata
+        return [osc for osc in self.oscilloscope_widgets
+                if isinstance(osc, Oscilloscope) and osc.channel == self.segmented_capture.channel]
+
+    @Slot()
+    def on_segment_capture_clicked(self):
+        capture = self.segmented_capture
+        count = self.ui.SegmentCountspbx.value() if hasattr(self.ui, 'SegmentCountspbx') else self.SEGMENT_COUNT
+        length = self.ui.SegmentLenspbx.value() if hasattr(self.ui, 'SegmentLenspbx') else self.SEGMENT_LEN
+        # Stesso fronte dei grafici: discesa solo se è selezionato il fronte negativo
+        if hasattr(self.ui, 'NegativeEdgech') and self.ui.NegativeEdgech.isChecked():
+            capture.handler.set_neg_edge_enabled(True)
+        else:
+            capture.handler.set_pos_edge_enabled(True)
+        if hasattr(self.ui, 'SegmentViewspbx'):
+            self.ui.SegmentViewspbx.setValue(0) # Torna al live durante la cattura
+        try:
+            capture.arm(count, length, self.SEGMENT_CHANNEL)
+        except ValueError as e:
+            print(f"Warning: segmented capture not armed: {e}")
+            return
+        print(f"Segmented capture armed: {count} segments of {length} samples "
+              f"on channel {capture.channel + 1}")
+
+    @Slot()
+    def on_segment_capture_finished(self):
+        stats = self.segmented_capture.stats()
+        print(f"Segmented capture done: {stats['segments']} segments in {stats['elapsed_s']:.2f} s "
+              f"(processing {stats['processing_s'] * 1e3:.1f} ms), "
+              f"min re-arm dead time {stats['min_dead_time_samples']} samples")
+        if hasattr(self.ui, 'SegmentViewspbx'):
+            self.ui.SegmentViewspbx.setMaximum(self.segmented_capture.count)
+            self.ui.SegmentViewspbx.setValue(1)
+        else:
+            self.on_segment_view_changed(1)
+
+    @Slot(int)
+    def on_segment_view_changed(self, number):
+        # 0 = live, k = segmenti sovrapposti con il k-esimo evidenziato
+        capture = self.segmented_capture
+        for osc in self._segment_widgets():
+            if number == 0 or capture.armed or capture.count == 0:
+                osc.hide_segments()
+            else:
+                osc.show_segments(capture, number - 1)
+        self.render_scheduler.request_frame()
+
+    def _read_voltage_controls(self):
+        if hasattr(self.ui, 'voltdiv_spbx') and hasattr(self.ui, 'voltdiv_cb'):
+            self.scale.set_voltage(self.ui.voltdiv_spbx.value(), self.ui.voltdiv_cb.currentText())
+
+    def _read_time_controls(self):
+        if hasattr(self.ui, 'timediv_spbx') and hasattr(self.ui, 'timediv_cb'):
+            self.scale.set_time(self.ui.timediv_spbx.value(), self.ui.timediv_cb.currentText())
+
     @Slot()
     def on_voltage_setting_changed(self):
         print("Voltage setting changed, emitting signal.")
+        self._read_voltage_controls() # Aggiorna il modello prima di notificare i grafici
         self.voltage_scale_changed.emit() # Emette il segnale per notificare i grafici
 
     @Slot()
     def on_time_setting_changed(self):
         print("Time setting changed, emitting signal.")
+        self._read_time_controls()
         self.time_scale_changed.emit() # Emette il segnale per notificare i grafici
 
 
     @Slot()
     def _update_display_modes(self):
-        # Legge le selezioni dai combo box FFT
-        fft1 = hasattr(self.ui, 'FFTcomb') and self.ui.FFTcomb.currentText() == "FFT"
-        fft2 = hasattr(self.ui, 'FFTcomb_2') and self.ui.FFTcomb_2.currentText() == "FFT"
+        # Legge le selezioni dai combo box FFT (uno dei DISPLAY_MODES dei grafici)
+        # (i combo box sono ancora vuoti alla prima chiamata)
+        mode1 = (self.ui.FFTcomb.currentText() if hasattr(self.ui, 'FFTcomb') else "") or "Time D."
+        mode2 = (self.ui.FFTcomb_2.currentText() if hasattr(self.ui, 'FFTcomb_2') else "") or "Time D."
 
         # Aggiorna la modalità di visualizzazione per ogni oscilloscopio
-        # Notifica tutti gli oscilloscopi, la logica display_timer nel tab attivo
-        # assicurerà che solo quelli visibili si aggiornino pesantemente
+        # Notifica tutti gli oscilloscopi, il RenderScheduler ridisegna
+        # solo quelli visibili
         if self.combined_osc:
-            self.combined_osc.set_display_mode("FFT" if fft1 and fft2 else "Time D.")
+            # Il grafico combinato cambia modo solo se i due canali sono d'accordo
+            self.combined_osc.set_display_mode(mode1 if mode1 == mode2 else "Time D.")
         if self.signal1_osc_tab2:
-            self.signal1_osc_tab2.set_display_mode("FFT" if fft1 else "Time D.")
+            self.signal1_osc_tab2.set_display_mode(mode1)
         if self.signal2_osc_tab3:
-            self.signal2_osc_tab3.set_display_mode("FFT" if fft2 else "Time D.")
+            self.signal2_osc_tab3.set_display_mode(mode2)
         if self.signal1_osc_tab4:
              # Per tab4, puoi decidere se entrambi seguono lo stesso combobox
              # o se channel 1 segue FFTcomb e channel 2 segue FFTcomb_2
              # Qui seguo la logica originale (channel 1 segue FFTcomb)
-            self.signal1_osc_tab4.set_display_mode("FFT" if fft1 else "Time D.")
+            self.signal1_osc_tab4.set_display_mode(mode1)
         if self.signal2_osc_tab4:
             # E channel 2 segue FFTcomb_2
-            self.signal2_osc_tab4.set_display_mode("FFT" if fft2 else "Time D.")
+            self.signal2_osc_tab4.set_display_mode(mode2)
+        # Il trigger condiviso conserva tutti gli sweep solo se qualche grafico è in persistenza
+        self.trigger_handler.collect_sweeps = any(
+            osc.display_mode == "Persist." for osc in self.oscilloscope_widgets)
+        self._update_spectrum_demand()
+
+    def _update_spectrum_demand(self):
+        # Ogni grafico del tab corrente si abbona all'analisi del proprio modo, per i propri
+        # canali; quelli nascosti o nel dominio del tempo a nessuna, e senza abbonati
+        # il worker non calcola né FFT né PSD
+        tabs = getattr(self.ui, 'tabWidget', None)
+        current = tabs.currentWidget() if isinstance(tabs, QTabWidget) else None
+        for osc in self.oscilloscope_widgets:
+            shown = current is None or current.isAncestorOf(osc)
+            analysis = SPECTRUM_MODES.get(osc.display_mode) if shown else None
+            self.signal_source.subscribe(osc.on_new_fft_data, "FFT",
+                                         osc.channels if analysis == "FFT" else ())
+            self.signal_source.subscribe(osc.on_new_psd_data, "PSD",
+                                         osc.channels if analysis == "PSD" else ())
 
     @Slot(int)
     def on_tab_changed(self, index):
-        # Ottieni il widget del tab corrente
-        current_tab = self.ui.tabWidget.widget(index)
-
-        # Ferma i timer di visualizzazione per TUTTI i grafici non attivi
-        for osc in self.oscilloscope_widgets:
-            if hasattr(osc, 'display_timer'):
-                # Controlla se l'oscilloscopio è nel tab corrente (direttamente o come figlio)
-                # Questo controllo è un po' più robusto rispetto a un semplice confronto con current_tab
-                is_in_current_tab = False
-                # Verifica se l'oscilloscopio è il widget del tab corrente
-                if osc == current_tab:
-                    is_in_current_tab = True
-                # Verifica se l'oscilloscopio è un discendente del widget del tab corrente
-                elif current_tab and osc.parent() == current_tab or osc.parent().parent() == current_tab: # Controllo rudimentale sul parent/grandparent
-                     is_in_current_tab = True
-                # Aggiungere controlli più specifici se i widget sono annidati più profondamente
-                # Ad es., controllare se osc è findChild() di current_tab (costoso)
-                # o verificare il layout di current_tab per trovare osc (meglio)
-                layout = current_tab.layout()
-                if layout:
-                    for i in range(layout.count()):
-                         item = layout.itemAt(i)
-                         if item and item.widget() == osc:
-                             is_in_current_tab = True
-                             break
-
-
-                if not is_in_current_tab:
-                    osc.display_timer.stop()
-                    # print(f"Stopped timer for {type(osc).__name__}")
-                else:
-                     # Avvia o riavvia il timer per i grafici nel tab corrente
-                    if not osc.display_timer.isActive():
-                         osc.display_timer.start()
-                         # print(f"Started timer for {type(osc).__name__}")
-                    # Forza un aggiornamento immediato all'attivazione del tab
-                    if hasattr(osc, 'update_display'):
-                        osc.update_display()
-                        # print(f"Forced update for {type(osc).__name__}")
+        # Gli spettri servono ora ai grafici del nuovo tab
+        self._update_spectrum_demand()
+        # I grafici dei tab nascosti non sono visibili e il RenderScheduler li salta:
+        # basta chiedere un frame subito per non aspettare il prossimo tick
+        self.render_scheduler.request_frame()
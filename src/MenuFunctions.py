@@ -47,6 +47,13 @@ class MenuFunctions(QObject):
         else:
             print("Warning: actionSave not found or not a QAction.")
 
+        # DEVICE Menu
+        if hasattr(self.ui, 'actionConnected_Device') and isinstance(self.ui.actionConnected_Device, QAction):
+            self.ui.actionConnected_Device.triggered.connect(
+                self.show_device_info)
+        else:
+            print("Warning: actionConnected_Device not found or not a QAction.")
+
         # VIEW Menu
         if hasattr(self.ui, 'actionFrequency_Domain') and isinstance(self.ui.actionFrequency_Domain, QAction):
             self.ui.actionFrequency_Domain.triggered.connect(
@@ -112,6 +119,30 @@ class MenuFunctions(QObject):
             QMessageBox.information(
                 self.main, "Not Found", f"Information file not found at: {file_path}")
 
+    @Slot()
+    def show_device_info(self):
+        if not self.gui_functions or not self.gui_functions.signal_source:
+            QMessageBox.warning(self.main, "Error", "No acquisition source available.")
+            return
+        source = self.gui_functions.signal_source
+        backend = source.backend
+        lines = [f"Source: {backend.name}",
+                 f"Sampling rate: {backend.sampling_rate_hz:g} Hz"]
+        if hasattr(backend, 'port'):
+            lines.append(f"Port: {backend.port}")
+        if hasattr(backend, 'file_path'):
+            lines.append(f"File: {backend.file_path}")
+
+        acq = source.acquisition_stats()
+        lines.append(f"Samples produced: {acq['produced']}, consumed: {acq['consumed']}, "
+                     f"dropped: {acq['dropped']}")
+        if hasattr(backend, 'stats'):
+            link = backend.stats()
+            lines.append(f"Frames ok: {link['frames_ok']}, dropped: {link['frames_dropped']}, "
+                         f"corrupt: {link['frames_corrupt']}")
+            lines.append(f"Bytes discarded (resync): {link['bytes_discarded']}")
+        QMessageBox.information(self.main, "Connected Device", "\n".join(lines))
+
     @Slot()
     def save_current_tab_screenshot(self):
         if ImageExporter is None:
@@ -1,13 +1,66 @@
 # OscilloscopeWidget.py
 from PySide6.QtWidgets import QWidget, QVBoxLayout
-from PySide6.QtCore import QTimer, Slot, Signal
+from PySide6.QtCore import QTimer, Slot, Signal, Qt
 from PySide6.QtGui import QPainter, QColor, QFont
-from PySide6.QtCore import QDateTime
+from PySide6.QtCore import QDateTime, QRectF
 import pyqtgraph as pg
 import numpy as np
-from src.trigger_handler import TriggerHandler
+from src.decimation import minmax_decimate
+from src.persistence import PersistenceMap, sweep_traces
+from src.welch import AVERAGE, MAX_HOLD, MIN_HOLD
+from src.waterfall import WaterfallRing
 import time
 
+DISPLAY_MODES = ("Time D.", "FFT", "PSD", "Waterfall", "Persist.")
+# Modi nel dominio del tempo: usano Volt/Div, Time/Div e i trigger
+TIME_MODES = ("Time D.", "Persist.")
+# Analisi in frequenza (SignalSource.ANALYSES) di cui ha bisogno ciascun modo
+SPECTRUM_MODES = {"FFT": "FFT", "Waterfall": "FFT", "PSD": "PSD"}
+WATERFALL_HISTORY = 256 # Spettri (righe) mostrati dalla cascata
+WATERFALL_RANGE_DB = 100.0 # Dinamica dei colori sotto la riga più forte
+
+
+def hold_pens(color):
+    # Max hold e min hold nel colore del canale, più tenui; il min hold tratteggiato
+    color = pg.mkColor(color)
+    color.setAlpha(120)
+    return pg.mkPen(color, width=1), pg.mkPen(color, width=1, style=Qt.PenStyle.DashLine)
+
+
+def psd_y_range(traces, units):
+    """(low, high) of the PSD plot: log10 decades for V²/Hz, dB for dBV."""
+    finite = traces[np.isfinite(traces)]
+    if finite.size == 0:
+        return (-12.0, 0.0) if units == "V²/Hz" else (-120.0, 0.0)
+    if units == "V²/Hz":
+        return np.log10(finite.min()) - 0.5, np.log10(finite.max()) + 0.5
+    return finite.min() - 5.0, finite.max() + 5.0
+
+
+def setup_waterfall_axes(plot_widget, sampling_rate_hz, span_s):
+    plot_widget.setLogMode(x=False, y=False)
+    plot_widget.setXRange(0, sampling_rate_hz / 2, padding=0.02)
+    plot_widget.setYRange(-span_s, 0, padding=0.0)
+    plot_widget.setLabel('bottom', 'Frequency', units='Hz')
+    plot_widget.setLabel('left', 'Time', units='s')
+
+
+def show_waterfall(image, ring, max_freq_hz, row_interval_s):
+    # Righe dalla più vecchia (in basso, -span) alla più recente (in alto, 0 s)
+    rows = ring.view()
+    high = float(rows.max())
+    image.setImage(rows, autoLevels=False, levels=(high - WATERFALL_RANGE_DB, high))
+    span_s = ring.history * row_interval_s
+    image.setRect(QRectF(0.0, -span_s, max_freq_hz, span_s))
+
+
+def setup_psd_axes(plot_widget, sampling_rate_hz, units):
+    plot_widget.setLogMode(x=False, y=units == "V²/Hz")
+    plot_widget.setXRange(0, sampling_rate_hz / 2, padding=0.05)
+    plot_widget.setLabel('bottom', 'Frequency', units='Hz')
+    # Senza units= pyqtgraph non aggiunge prefissi SI a V²/Hz e dBV
+    plot_widget.setLabel('left', f"PSD ({units})" if units == "V²/Hz" else f"Level ({units})")
+
 
 class Oscilloscope(QWidget):
     def __init__(self, buffer_size, sampling_rate_hz, gui_functions_ref, parent=None):
@@ -22,20 +75,53 @@ class Oscilloscope(QWidget):
             pg.setConfigOptions(useOpenGL=False)
         self.layout.addWidget(self.plot_widget)
         self.plot = self.plot_widget.plot(pen=pg.mkPen('y', width=2))
+        # Memoria segmentata: tutti i segmenti sovrapposti, sotto a quello selezionato
+        self.segment_curve = self.plot_widget.plot(pen=pg.mkPen((255, 255, 0, 40)), connect='finite')
+        self.segment_curve.setZValue(-1)
         self.buffer_size = buffer_size
         self.sampling_rate_hz = sampling_rate_hz
         self.gui_funcs = gui_functions_ref
-        self.y_data = np.zeros(self.buffer_size, dtype=np.float64)
-        self.ptr = 0
-        self.display_timer = QTimer(self)
-        self.display_timer.timeout.connect(self.update_display)
-        self.display_timer.start(33)  # ~30 FPS display update
+        # I campioni stanno nel DataHub condiviso; y_data contiene solo il frame
+        # congelato dal trigger (None = visualizzazione live dall'hub)
+        self.hub = None
+        self.pyramid = None
+        self.channel = 0
+        self.y_data = None
+        self._sweep_frame = None
+        self._sweep_offset = 0.0
+        self._segments = None  # SegmentedCapture visualizzata (None = live/sweep)
+        self._segment_number = 0
+        self._segment_generation = 0
+        # Persistenza: istogramma tempo x tensione di tutti gli sweep, disegnato come immagine
+        self.persistence = PersistenceMap()
+        self.persist_image = pg.ImageItem()
+        self.persist_image.setLookupTable(pg.colormap.get('inferno').getLookupTable(nPts=256))
+        self._persist_write_index = 0
+        # Cascata: anello di spettri in dB (creato dalle sottoclassi, che conoscono i bin),
+        # disegnato con frequenza in orizzontale e tempo in verticale
+        self.waterfall = None
+        self.waterfall_image = pg.ImageItem(axisOrder='row-major')
+        self.waterfall_image.setLookupTable(pg.colormap.get('inferno').getLookupTable(nPts=256))
+        # Il ridisegno è guidato dal RenderScheduler condiviso di GuiFunctions
         self.display_mode = "Time D."
         self._initial_scale_set = False
         self._last_display_mode = None
-        
-        self.trigger_handler = TriggerHandler(self.buffer_size)
-        
+        # Generazioni dei dati visualizzati: un frame viene ridisegnato solo se cambiano
+        self._frozen_generation = 0
+        self._fft_generation = 0
+        self._psd_generation = 0
+        self._last_render_key = None
+        # PSD di Welch: tracce (3, bin) di questo canale, media + max/min hold
+        self.last_psd = None
+        self.last_psd_freq_hz = np.array([])
+        self.hold_curves = self._add_hold_curves(self.plot.opts['pen'].color())
+
+        # Trigger unico di GuiFunctions, condiviso da tutti i grafici: ogni grafico
+        # ricorda solo l'ultima generazione di sweep che ha già preso
+        self.trigger_handler = self.gui_funcs.trigger_handler
+        self._sweep_generation = 0
+        self._collected_generation = 0
+
         if hasattr(self.gui_funcs.ui, 'PositiveEdgech'):
             self.gui_funcs.ui.PositiveEdgech.stateChanged.connect(self.on_pos_edge_trigger_changed)
         if hasattr(self.gui_funcs.ui, 'NegativeEdgech'):
@@ -49,7 +135,7 @@ class Oscilloscope(QWidget):
         self.tab_name = ""  # Will be set by the main window
 
     def initialize_scales(self):
-        if self.display_mode == "Time D.":
+        if self.display_mode in TIME_MODES:
             self.plot_widget.setLogMode(x=False, y=False)
             self.plot_widget.setYRange(-1, 1, padding=0.05)
             self.plot_widget.setXRange(0, 0.1, padding=0.05)
@@ -67,143 +153,309 @@ class Oscilloscope(QWidget):
             
             self.plot_widget.setYRange(np.log10(1e-10), 0, padding=0.05)
 
+        elif self.display_mode == "PSD":
+            setup_psd_axes(self.plot_widget, self.sampling_rate_hz, self.gui_funcs.signal_source.psd_units)
+
+        elif self.display_mode == "Waterfall":
+            setup_waterfall_axes(self.plot_widget, self.sampling_rate_hz,
+                                 WATERFALL_HISTORY * self.gui_funcs.signal_source.fft_interval_s)
+
         self._initial_scale_set = True
         self._last_display_mode = self.display_mode
+        self._last_render_key = None
 
     @Slot()
     def update_voltage_scale(self):
-        if not (hasattr(self.gui_funcs.ui, 'voltdiv_spbx') and hasattr(self.gui_funcs.ui, 'voltdiv_cb')):
-            return
-
-        value = self.gui_funcs.ui.voltdiv_spbx.value()
-        unit_text = self.gui_funcs.ui.voltdiv_cb.currentText()
-
-        multiplier = 1.0
-        if unit_text == "mV":
-            multiplier = 1e-3
-        elif unit_text == "uV":
-            multiplier = 1e-6
-
-        if self.display_mode == "Time D.":
-            volt_range_total = 10 * value * multiplier
-            self.plot_widget.setYRange(-volt_range_total / 2,
-                                       volt_range_total / 2, padding=0.05)
+        scale = self.gui_funcs.scale
+        if self.display_mode in TIME_MODES:
+            self.plot_widget.setYRange(-scale.total_volts / 2,
+                                       scale.total_volts / 2, padding=0.05)
             self.plot_widget.getAxis('left').setLabel(
-                'Voltage', units=unit_text)
+                'Voltage', units=scale.volt_unit)
+            self._update_persistence_range()
 
     @Slot()
     def update_time_scale(self):
-        if not (hasattr(self.gui_funcs.ui, 'timediv_spbx') and hasattr(self.gui_funcs.ui, 'timediv_cb')):
-            return
-
-        time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-        unit_text = self.gui_funcs.ui.timediv_cb.currentText()
-
-        unit_multiplier = 1.0
-        if unit_text == "ms":
-            unit_multiplier = 1e-3
-        elif unit_text == "us":
-            unit_multiplier = 1e-6
-
-        if self.display_mode == "Time D.":
-            total_display_window_time = time_per_div_val * unit_multiplier * 10
+        scale = self.gui_funcs.scale
+        if self.display_mode in TIME_MODES:
             self.plot_widget.setXRange(
-                0, total_display_window_time, padding=0.01)
+                0, scale.total_time, padding=0.01)
             self.plot_widget.getAxis('bottom').setLabel(
-                'Time', units=unit_text)
+                'Time', units=scale.time_unit)
+            self._set_sweep_frame(scale.total_time)
+            self._update_persistence_range()
+
+    def _update_persistence_range(self):
+        # La mappa copre lo schermo: Time/Div x 10 in orizzontale, Volt/Div x 10 in verticale
+        scale = self.gui_funcs.scale
+        self.persistence.set_range(0, scale.total_time, -scale.total_volts / 2, scale.total_volts / 2)
+
+    def _set_sweep_frame(self, total_display_window_time):
+        # Lo sweep copre la finestra Time/Div con il trigger al centro
+        n = min(self.hub.depth, self._window_samples(total_display_window_time))
+        handler = self.trigger_handler
+        if n != handler.pre_trigger_samples + handler.post_trigger_samples:
+            # Il frame cambia lunghezza: il vecchio sweep non è più confrontabile
+            # (il trigger è condiviso, lo imposta il primo grafico che se ne accorge)
+            handler.set_frame(n // 2, n - n // 2)
+            handler.rearm()
+        if self.y_data is not None and self.y_data.shape[0] != n:
+            self.y_data = None
 
     @Slot(int)
     def on_pos_edge_trigger_changed(self, state):
-        self.trigger_handler.set_pos_edge_enabled(state == 2)
+        # Il trigger condiviso è aggiornato da GuiFunctions; qui si torna al live
         if state == 0:
-            self.trigger_handler.unfreeze()
+            self.y_data = None
 
     @Slot(int)
     def on_neg_edge_trigger_changed(self, state):
-        self.trigger_handler.set_neg_edge_enabled(state == 2)
         if state == 0:
-            self.trigger_handler.unfreeze()
+            self.y_data = None
 
-    def add_new_data_point(self, new_data):
-        self.y_data[self.ptr] = new_data
-        self.ptr = (self.ptr + 1) % self.buffer_size
-        
-        if self.display_mode == "Time D.":
-            trigger_idx = self.trigger_handler.check_trigger(self.y_data)
-            if trigger_idx is not None:
-                self.center_display_at_trigger(trigger_idx)
+    def _window_samples(self, total_display_window_time):
+        # Campioni che coprono le 10 divisioni orizzontali (limitati dalla memoria)
+        return max(2, int(round(total_display_window_time * self.sampling_rate_hz)))
+
+    def _plot_width(self):
+        return max(int(self.plot_widget.width()), 100)
 
-    def center_display_at_trigger(self, trigger_idx):
-        if not self.trigger_handler.is_frozen:
+    def _plot_time_window(self, total_display_window_time):
+        width = self._plot_width()
+        if self._showing_sweep():
+            plot_x_time = self._sweep_x_axis(self.y_data.shape[0])
+            self.plot.setData(*minmax_decimate(plot_x_time, self.y_data, width))
             return
-            
-        points_before = self.buffer_size // 2
-        points_after = self.buffer_size - points_before
-        
-        centered_data = np.zeros_like(self.y_data)
-        
-        for i in range(points_before):
-            idx = (trigger_idx - points_before + i) % self.buffer_size
-            centered_data[i] = self.y_data[idx]
-            
-        for i in range(points_after):
-            idx = (trigger_idx + i) % self.buffer_size
-            centered_data[points_before + i] = self.y_data[idx]
-            
-        self.y_data = centered_data
-        
-        if self.display_mode == "Time D.":
-            time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-            unit_text_time = self.gui_funcs.ui.timediv_cb.currentText()
-            multiplier_time = 1.0
-            if unit_text_time == "ms":
-                multiplier_time = 1e-3
-            elif unit_text_time == "us":
-                multiplier_time = 1e-6
-            total_display_window_time = time_per_div_val * multiplier_time * 10
-            
-            trigger_time = total_display_window_time / 2
-            self.plot_widget.setXRange(0, total_display_window_time, padding=0.05)
-            
-            signal_range = np.ptp(self.y_data)
-            current_volt_div = self.gui_funcs.ui.voltdiv_spbx.value()
-            unit_text_volt = self.gui_funcs.ui.voltdiv_cb.currentText()
-            volt_multiplier = 1.0
-            if unit_text_volt == "mV":
-                volt_multiplier = 1e-3
-            elif unit_text_volt == "uV":
-                volt_multiplier = 1e-6
-                
-            current_volt_range = current_volt_div * volt_multiplier * 10
-            if signal_range > current_volt_range * 0.8:
-                new_volt_div = (signal_range / 8) / volt_multiplier
-                self.gui_funcs.ui.voltdiv_spbx.setValue(new_volt_div)
-            elif signal_range < current_volt_range * 0.2:
-                new_volt_div = (signal_range / 4) / volt_multiplier
-                self.gui_funcs.ui.voltdiv_spbx.setValue(new_volt_div)
-                
-            self.update_voltage_scale()
-            self.update_display()
+        # Live: legge dalla piramide min/max il livello adatto alla Time/Div,
+        # poi riduce a una coppia min/max per colonna di pixel
+        offsets, values = self.pyramid.read_latest(
+            self._window_samples(total_display_window_time), width)
+        self.plot.setData(*minmax_decimate(offsets / self.sampling_rate_hz, values[self.channel], width))
+
+    def _showing_sweep(self):
+        # Con un trigger attivo si visualizza l'ultimo sweep catturato (se c'è)
+        return self.trigger_handler.trigger_enabled and self.y_data is not None
+
+    def _take_sweep(self):
+        # Al massimo uno sweep per frame: quelli completati nel frattempo sono già scartati
+        sweep = self.trigger_handler.sweep_since(self._sweep_generation)
+        if sweep is not None:
+            self._sweep_generation = sweep[0]
+            self.center_display_at_trigger(sweep[1], sweep[3])
+
+    def _sweep_x_axis(self, n_points):
+        # Il punto di trigger cade tra due campioni: si sposta l'asse x, non i dati,
+        # così sweep successivi restano allineati senza ricampionare il frame
+        plot_x_time = self.gui_funcs.scale.x_axis(n_points)
+        if self._sweep_offset == 0.0 or n_points < 2:
+            return plot_x_time
+        return plot_x_time - self._sweep_offset * (plot_x_time[1] - plot_x_time[0])
+
+    def center_display_at_trigger(self, trigger_index, offset=0.0):
+        # trigger_index è l'indice assoluto del campione di trigger nell'hub,
+        # offset la posizione frazionaria del trigger rispetto a esso
+        handler = self.trigger_handler
+        n = handler.pre_trigger_samples + handler.post_trigger_samples
+        start_index = trigger_index - handler.pre_trigger_samples
+        if start_index < self.hub.write_index - self.hub.available:
+            return  # Sweep già sovrascritto nella memoria
+
+        # Il ring dell'hub è specchiato: il frame allineato al trigger è una sola fetta
+        # contigua, copiata in un buffer preallocato così una cattura Single/Stop
+        # sopravvive al riavvolgimento della memoria
+        frame = self.hub.window(start_index, n)[self.channel]
+        first_sweep = self.y_data is None
+        if self._sweep_frame is None or self._sweep_frame.shape != frame.shape:
+            self._sweep_frame = np.empty_like(frame)
+        np.copyto(self._sweep_frame, frame)
+        self.y_data = self._sweep_frame
+        self._sweep_offset = offset
+        self._frozen_generation += 1
+
+        # Autorange solo sul primo sweep dopo l'armamento e solo su questo grafico:
+        # Volt/Div e gli altri grafici non vengono toccati
+        if self.display_mode == "Time D." and first_sweep:
+            self._autorange(np.ptp(self.y_data))
+
+    def _autorange(self, signal_range):
+        span = self.gui_funcs.scale.autorange_volts(signal_range)
+        if span is not None:
+            self.plot_widget.setYRange(-span / 2, span / 2, padding=0.05)
+
+    def show_segments(self, capture, number):
+        """Overlay every segment of a finished SegmentedCapture, segment `number` highlighted."""
+        self._segments = capture
+        self._segment_number = min(max(number, 0), capture.count - 1)
+        self._segment_generation += 1
+
+    def hide_segments(self):
+        if self._segments is None:
+            return
+        self._segments = None
+        self._segment_generation += 1
+        self.segment_curve.setData([], [])
+        self.update_time_scale()
+
+    def _plot_segments(self):
+        capture = self._segments
+        if capture.count == 0:
+            self.plot.setData([], [])
+            self.segment_curve.setData([], [])
+            return
+        x = capture.segment_x_axis()
+        y = capture.segments[:capture.count]
+        # Una sola curva per la sovrapposizione: ogni segmento è chiuso da un NaN
+        x_all = np.full((capture.count, capture.segment_len + 1), np.nan)
+        y_all = np.full((capture.count, capture.segment_len + 1), np.nan)
+        x_all[:, :-1] = x
+        y_all[:, :-1] = y
+        self.segment_curve.setData(x_all.ravel(), y_all.ravel(), connect='finite')
+        self.plot.setData(x[self._segment_number], y[self._segment_number])
+        self.plot_widget.setXRange(x[:, 0].min(), x[:, -1].max(), padding=0.02)
+
+    def _accumulate_persistence(self):
+        # Tutti gli sweep completati dall'ultimo frame, in un solo passaggio vettoriale;
+        # senza trigger si accumula la finestra più recente (free-run)
+        handler = self.trigger_handler
+        self._collected_generation, indices, offsets = handler.collected_since(self._collected_generation)
+        n = handler.pre_trigger_samples + handler.post_trigger_samples
+        new_samples = self.hub.write_index - self._persist_write_index
+        self._persist_write_index = self.hub.write_index
+        if new_samples <= 0:
+            return
+        if not handler.trigger_enabled and self.hub.available >= n:
+            indices = np.array([self.hub.write_index - handler.post_trigger_samples])
+            offsets = np.zeros(1)
+        x_axis = self.gui_funcs.scale.x_axis(n)
+        x, y = sweep_traces(self.hub, self.channel, indices, offsets,
+                            handler.pre_trigger_samples, n, x_axis)
+        self.persistence.accumulate(x, y, new_samples / self.sampling_rate_hz)
+
+    def _plot_persistence(self):
+        persistence = self.persistence
+        self.persist_image.setImage(persistence.image(), autoLevels=True)
+        self.persist_image.setRect(QRectF(persistence.t_min, persistence.v_min,
+                                          persistence.t_max - persistence.t_min,
+                                          persistence.v_max - persistence.v_min))
+
+    def _set_persistence_enabled(self, enabled):
+        # collect_sweeps del trigger condiviso è gestito da GuiFunctions; gli sweep
+        # raccolti prima di questo momento non vanno nella mappa
+        self._collected_generation = self.trigger_handler.sweep_generation
+        self._persist_write_index = self.hub.write_index
+        self.persistence.clear()
+        in_plot = self.persist_image in self.plot_widget.getPlotItem().items
+        if enabled and not in_plot:
+            self.plot_widget.addItem(self.persist_image)
+            self.persist_image.setZValue(-2)
+            self.plot.setData([], [])
+        elif not enabled and in_plot:
+            self.plot_widget.removeItem(self.persist_image)
+
+    @property
+    def channels(self):
+        """Channels shown by this plot, for the spectrum subscriptions."""
+        return (self.channel,)
+
+    def _plot_waterfall(self):
+        show_waterfall(self.waterfall_image, self.waterfall, self.sampling_rate_hz / 2,
+                       self.gui_funcs.signal_source.fft_interval_s)
+
+    def _set_waterfall_enabled(self, enabled):
+        # La cascata riparte vuota a ogni ingresso nel modo
+        self.waterfall.clear()
+        in_plot = self.waterfall_image in self.plot_widget.getPlotItem().items
+        if enabled and not in_plot:
+            self.plot_widget.addItem(self.waterfall_image)
+            self.waterfall_image.setZValue(-2)
+        elif not enabled and in_plot:
+            self.plot_widget.removeItem(self.waterfall_image)
+
+    def _add_hold_curves(self, color):
+        return tuple(self.plot_widget.plot(pen=pen) for pen in hold_pens(color))
+
+    def set_trace_color(self, color):
+        self.plot.setPen(pg.mkPen(color, width=2))
+        for curve, pen in zip(self.hold_curves, hold_pens(color)):
+            curve.setPen(pen)
+
+    @Slot(np.ndarray, np.ndarray)
+    def on_new_psd_data(self, x_freq_hz, traces):
+        # traces è (3, canali, bin) nelle unità scelte; si tiene la vista del proprio canale
+        self._psd_generation += 1
+        self.last_psd_freq_hz = x_freq_hz
+        self.last_psd = traces[:, self.channel]
+
+    def _plot_psd(self):
+        if self.last_psd is None:
+            self.plot.setData([], [])
+            for curve in self.hold_curves:
+                curve.setData([], [])
+            return
+        x = self.last_psd_freq_hz
+        self.plot.setData(x, self.last_psd[AVERAGE])
+        holds = (self.gui_funcs.psd_max_hold, self.gui_funcs.psd_min_hold)
+        for curve, row, shown in zip(self.hold_curves, (MAX_HOLD, MIN_HOLD), holds):
+            if shown:
+                curve.setData(x, self.last_psd[row])
+            else:
+                curve.setData([], [])
+        shown_rows = [AVERAGE] + [row for row, shown in zip((MAX_HOLD, MIN_HOLD), holds) if shown]
+        low, high = psd_y_range(self.last_psd[shown_rows], self.gui_funcs.signal_source.psd_units)
+        self.plot_widget.setYRange(low, high, padding=0.02)
+
+    def _render_key(self, total_display_window_time):
+        # Cambia solo se il prossimo frame sarebbe diverso dall'ultimo disegnato
+        if self.display_mode == "FFT":
+            data_generation = ('fft', self._fft_generation)
+        elif self.display_mode == "PSD":
+            data_generation = ('psd', self._psd_generation,
+                               self.gui_funcs.psd_max_hold, self.gui_funcs.psd_min_hold)
+        elif self.display_mode == "Waterfall":
+            data_generation = ('waterfall', self.waterfall.generation)
+        elif self.display_mode == "Persist.":
+            data_generation = ('persist', self.persistence.generation)
+        elif self._segments is not None:
+            data_generation = ('segments', self._segment_generation)
+        elif self._showing_sweep():
+            data_generation = ('frozen', self._frozen_generation)
+        else:
+            data_generation = ('live', self.hub.write_index)
+        return (self.display_mode, data_generation, total_display_window_time, self._plot_width())
 
     def update_display(self):
         if not self._initial_scale_set:
             self.initialize_scales()
             return
 
+        total_display_window_time = self.gui_funcs.scale.total_time
         if self.display_mode == "Time D.":
-            time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-            unit_text_time = self.gui_funcs.ui.timediv_cb.currentText()
-            multiplier_time = 1.0
-            if unit_text_time == "ms":
-                multiplier_time = 1e-3
-            elif unit_text_time == "us":
-                multiplier_time = 1e-6
-            total_display_window_time = time_per_div_val * multiplier_time * 10
-
-            plot_x_time = np.linspace(0, total_display_window_time, self.buffer_size)
-            self.plot.setData(plot_x_time, self.y_data)
+            self._take_sweep()
+        elif self.display_mode == "Persist.":
+            self._accumulate_persistence()
+        # Niente di nuovo da disegnare: nessun dato, scala, modo o dimensione cambiati
+        render_key = self._render_key(total_display_window_time)
+        if render_key == self._last_render_key:
+            return
+        self._last_render_key = render_key
+
+        if self.display_mode == "Time D." and self._segments is not None:
+            self._plot_segments()
+
+        elif self.display_mode == "Time D.":
+            self._plot_time_window(total_display_window_time)
             self.plot_widget.setXRange(0, total_display_window_time, padding=0.02)
 
+        elif self.display_mode == "Persist.":
+            self._plot_persistence()
+            self.plot_widget.setXRange(0, total_display_window_time, padding=0.02)
+
+        elif self.display_mode == "PSD":
+            self._plot_psd()
+
+        elif self.display_mode == "Waterfall":
+            self._plot_waterfall()
+
         elif self.display_mode == "FFT":
             if self.last_x_freq_hz.size > 0 and self.last_fft_magnitude.size > 0:
                 magnitude = np.maximum(self.last_fft_magnitude, 1e-10)
@@ -219,22 +471,30 @@ class Oscilloscope(QWidget):
                 self.plot.setData([], [])
 
     def reset_view(self):
-        if self.display_mode == "Time D.":
-            self.y_data = np.zeros(self.buffer_size, dtype=np.float64)
-            self.ptr = 0
+        if self.display_mode in TIME_MODES:
+            self.y_data = None
+            for curve in self.hold_curves:
+                curve.setData([], [])
         else:
+            pen = self.plot.opts['pen']
             self.plot_widget.clear()
-            self.plot = self.plot_widget.plot(pen=pg.mkPen('y', width=2))
+            self.plot = self.plot_widget.plot(pen=pen)
+            self.segment_curve = self.plot_widget.plot(pen=pg.mkPen((255, 255, 0, 40)), connect='finite')
+            self.segment_curve.setZValue(-1)
+            self.hold_curves = self._add_hold_curves(pen.color())
             
         self._initial_scale_set = False
         self.initialize_scales()
 
     @Slot(str)
     def set_display_mode(self, mode):
-        if mode in ["Time D.", "FFT"]:
+        if mode in DISPLAY_MODES:
             if self.display_mode != mode:
                 self.display_mode = mode
+                self._set_persistence_enabled(mode == "Persist.")
                 self.reset_view()
+                # Dopo reset_view, che svuota il grafico fuori dal dominio del tempo
+                self._set_waterfall_enabled(mode == "Waterfall")
         else:
             print(f"Unknown mode: {mode}")
 
@@ -282,155 +542,62 @@ class Signal1Oscilloscope(Oscilloscope):
     def __init__(self, signal_source, buffer_size, sampling_rate_hz, gui_functions_ref, parent=None):
         super().__init__(buffer_size, sampling_rate_hz, gui_functions_ref, parent)
         self.plot_widget.setTitle("Channel 1")
-        self.plot.setPen(pg.mkPen('g', width=2))
+        self.set_trace_color('g')
         self.signal_source = signal_source
-        self.fft_len = self.buffer_size // 2
+        self.hub = signal_source.hub
+        self.pyramid = signal_source.pyramid
+        self.channel = 0
+        self.fft_len = self.signal_source.fft_len
         self.last_x_freq_hz = np.array([])
         self.last_fft_magnitude = np.zeros(self.fft_len, dtype=np.float64)
-        self.signal_source.data_updated.connect(self.on_new_data)
-        self.signal_source.fft_data_updated.connect(self.on_new_fft_data)
-
-    @Slot(float, float)
-    def on_new_data(self, value1, value2):
-        if not self.trigger_handler.is_frozen:
-            self.add_new_data_point(value1)
+        self.waterfall = WaterfallRing(WATERFALL_HISTORY, self.fft_len)
 
     @Slot(np.ndarray, np.ndarray, np.ndarray)
     def on_new_fft_data(self, x_freq_hz, fft_mag1, fft_mag2):
-        if fft_mag1.size == self.fft_len:
-            self.last_fft_magnitude = fft_mag1
-        else:
-            print(f"Size mismatch - expected {self.fft_len}, got {fft_mag1.size}")
-            
-        if x_freq_hz.size == self.fft_len:
-            self.last_x_freq_hz = x_freq_hz
-        else:
-            print(f"Size mismatch - expected {self.fft_len}, got {x_freq_hz.size}")
-
-    def update_display(self):
-        if not self._initial_scale_set:
-            self.initialize_scales()
-            return
-
-        if self.display_mode == "Time D.":
-            time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-            unit_text_time = self.gui_funcs.ui.timediv_cb.currentText()
-            multiplier_time = 1.0
-            if unit_text_time == "ms":
-                multiplier_time = 1e-3
-            elif unit_text_time == "us":
-                multiplier_time = 1e-6
-            total_display_window_time = time_per_div_val * multiplier_time * 10
-
-            plot_x_time = np.linspace(0, total_display_window_time, self.buffer_size)
-            self.plot.setData(plot_x_time, self.y_data)
-            
-            self.plot_widget.setXRange(0, total_display_window_time, padding=0.02)
-
-        elif self.display_mode == "FFT":
-            if self.last_x_freq_hz.size > 0 and self.last_fft_magnitude.size > 0:
-                magnitude = np.maximum(self.last_fft_magnitude, 1e-10)
-                self.plot.setData(self.last_x_freq_hz, magnitude)
-                
-                max_freq = np.max(self.last_x_freq_hz)
-                max_mag = np.max(magnitude)
-                
-                self.plot_widget.setXRange(0, max_freq * 1.1, padding=0.05)
-                if max_mag > 1e-10:
-                    self.plot_widget.setYRange(np.log10(1e-10), np.log10(max_mag * 2), padding=0.05)
-            else:
-                self.plot.setData([], [])
-
-    @Slot(str)
-    def set_display_mode(self, mode):
-        if mode in ["Time D.", "FFT"]:
-            if self.display_mode != mode:
-                self.display_mode = mode
-                self.reset_view()
-        else:
-            print(f"Unknown mode: {mode}")
+        # Arriva solo mentre il grafico è abbonato alla FFT del suo canale (vedi
+        # SignalSource.subscribe); gli array hanno sempre fft_len bin
+        self._fft_generation += 1
+        self.last_fft_magnitude = fft_mag1
+        self.last_x_freq_hz = x_freq_hz
+        if self.display_mode == "Waterfall":
+            self.waterfall.push(fft_mag1)
 
 
 class Signal2Oscilloscope(Oscilloscope):
     def __init__(self, signal_source, buffer_size, sampling_rate_hz, gui_functions_ref, parent=None):
         super().__init__(buffer_size, sampling_rate_hz, gui_functions_ref, parent)
         self.plot_widget.setTitle("Channel 2")
-        self.plot.setPen(pg.mkPen('b', width=2))
+        self.set_trace_color('b')
         self.signal_source = signal_source
-        self.fft_len = self.buffer_size // 2
+        self.hub = signal_source.hub
+        self.pyramid = signal_source.pyramid
+        self.channel = 1
+        self.fft_len = self.signal_source.fft_len
         self.last_x_freq_hz = np.array([])
         self.last_fft_magnitude = np.zeros(self.fft_len, dtype=np.float64)
-        self.signal_source.data_updated.connect(self.on_new_data)
-        self.signal_source.fft_data_updated.connect(self.on_new_fft_data)
-
-    @Slot(float, float)
-    def on_new_data(self, value1, value2):
-        if not self.trigger_handler.is_frozen:
-            self.add_new_data_point(value2)
+        self.waterfall = WaterfallRing(WATERFALL_HISTORY, self.fft_len)
 
     @Slot(np.ndarray, np.ndarray, np.ndarray)
     def on_new_fft_data(self, x_freq_hz, fft_mag1, fft_mag2):
-        if fft_mag2.size == self.fft_len:
-            self.last_fft_magnitude = fft_mag2
-        else:
-            print(f"Size mismatch - expected {self.fft_len}, got {fft_mag2.size}")
-            
-        if x_freq_hz.size == self.fft_len:
-            self.last_x_freq_hz = x_freq_hz
-        else:
-            print(f"Size mismatch - expected {self.fft_len}, got {x_freq_hz.size}")
-
-    def update_display(self):
-        if not self._initial_scale_set:
-            self.initialize_scales()
-            return
-
-        if self.display_mode == "Time D.":
-            time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-            unit_text_time = self.gui_funcs.ui.timediv_cb.currentText()
-            multiplier_time = 1.0
-            if unit_text_time == "ms":
-                multiplier_time = 1e-3
-            elif unit_text_time == "us":
-                multiplier_time = 1e-6
-            total_display_window_time = time_per_div_val * multiplier_time * 10
-
-            plot_x_time = np.linspace(0, total_display_window_time, self.buffer_size)
-            self.plot.setData(plot_x_time, self.y_data)
-            
-            self.plot_widget.setXRange(0, total_display_window_time, padding=0.02)
-
-        elif self.display_mode == "FFT":
-            if self.last_x_freq_hz.size > 0 and self.last_fft_magnitude.size > 0:
-                magnitude = np.maximum(self.last_fft_magnitude, 1e-10)
-                self.plot.setData(self.last_x_freq_hz, magnitude)
-                
-                max_freq = np.max(self.last_x_freq_hz)
-                max_mag = np.max(magnitude)
-                
-                self.plot_widget.setXRange(0, max_freq * 1.1, padding=0.05)
-                if max_mag > 1e-10:
-                    self.plot_widget.setYRange(np.log10(1e-10), np.log10(max_mag * 2), padding=0.05)
-            else:
-                self.plot.setData([], [])
-
-    @Slot(str)
-    def set_display_mode(self, mode):
-        if mode in ["Time D.", "FFT"]:
-            if self.display_mode != mode:
-                self.display_mode = mode
-                self.reset_view()
-        else:
-            print(f"Unknown mode: {mode}")
+        # Arriva solo mentre il grafico è abbonato alla FFT del suo canale (vedi
+        # SignalSource.subscribe); gli array hanno sempre fft_len bin
+        self._fft_generation += 1
+        self.last_fft_magnitude = fft_mag2
+        self.last_x_freq_hz = x_freq_hz
+        if self.display_mode == "Waterfall":
+            self.waterfall.push(fft_mag2)
 
 
 class CombinedOscilloscope(QWidget):
     def __init__(self, signal_source, buffer_size, sampling_rate_hz, gui_functions_ref, parent=None):
         super().__init__(parent=parent)
         self.signal_source = signal_source
+        self.hub = signal_source.hub
+        self.pyramid = signal_source.pyramid
         self.buffer_size = buffer_size
         self.sampling_rate_hz = sampling_rate_hz
         self.gui_funcs = gui_functions_ref
+        self.channels = (0, 1)
         self.layout = QVBoxLayout(self)
         self.setLayout(self.layout)
         self.plot_widget = pg.PlotWidget()
@@ -444,36 +611,42 @@ class CombinedOscilloscope(QWidget):
         self.curve2 = self.plot_widget.plot(pen=pg.mkPen('b', width=2), name='Channel 2')
         self.plot_widget.setTitle("Combined Channels 1 & 2")
 
-        # Initialize data arrays
+        # Initialize data arrays (i campioni live sono letti dall'hub condiviso;
+        # y1_data/y2_data contengono solo i frame congelati dal trigger)
         self.time_values_for_plot = np.zeros(self.buffer_size)
-        self.y1_data = np.zeros(self.buffer_size, dtype=np.float64)
-        self.y2_data = np.zeros(self.buffer_size, dtype=np.float64)
-        self.ptr = 0
+        self.y1_data = None
+        self.y2_data = None
+        self._sweep_frame = None
+        self._sweep_offset = 0.0
         
         # Initialize recording-related attributes
         self.is_recording = False
         self.recording_start_time = None
         self.tab_name = "Combined"
         self.display_mode = "Time D."
-        self.fft_len = self.buffer_size // 2
+        self.fft_len = self.signal_source.fft_len
         self.last_x_freq_hz = np.array([])
         self.last_fft_mag1 = np.zeros(self.fft_len, dtype=np.float64)
         self.last_fft_mag2 = np.zeros(self.fft_len, dtype=np.float64)
+        # Cascata: un anello per canale, sommati a schermo nei colori delle curve
+        self.waterfalls = (WaterfallRing(WATERFALL_HISTORY, self.fft_len),
+                           WaterfallRing(WATERFALL_HISTORY, self.fft_len))
+        self.waterfall_images = (pg.ImageItem(axisOrder='row-major'), pg.ImageItem(axisOrder='row-major'))
+        for image, color in zip(self.waterfall_images, ((0, 255, 0), (0, 0, 255))):
+            image.setLookupTable(pg.ColorMap([0.0, 1.0], [(0, 0, 0), color]).getLookupTable(nPts=256))
+            image.setCompositionMode(QPainter.CompositionMode.CompositionMode_Plus)
+
+        # Un solo trigger (quello condiviso, sulla sorgente scelta): entrambi i canali
+        # vengono allineati allo stesso indice
+        self.trigger_handler = self.gui_funcs.trigger_handler
+        self._sweep_generation = 0
+        self._collected_generation = 0
 
-        self.display_timer = QTimer(self)
-        self.display_timer.timeout.connect(self.update_display)
-        self.display_timer.start(33)
-
-        self.trigger_handler1 = TriggerHandler(self.buffer_size)
-        self.trigger_handler2 = TriggerHandler(self.buffer_size)
-        
         if hasattr(self.gui_funcs.ui, 'PositiveEdgech'):
             self.gui_funcs.ui.PositiveEdgech.stateChanged.connect(self.on_pos_edge_trigger_changed)
         if hasattr(self.gui_funcs.ui, 'NegativeEdgech'):
             self.gui_funcs.ui.NegativeEdgech.stateChanged.connect(self.on_neg_edge_trigger_changed)
 
-        self.signal_source.data_updated.connect(self.on_new_data)
-        self.signal_source.fft_data_updated.connect(self.on_new_fft_data)
 
         if self.gui_funcs:
             self.gui_funcs.voltage_scale_changed.connect(
@@ -481,10 +654,25 @@ class CombinedOscilloscope(QWidget):
             self.gui_funcs.time_scale_changed.connect(self.update_time_scale)
 
         self._initial_scale_set = False
+        self._frozen_generation = 0
+        self._fft_generation = 0
+        self._psd_generation = 0
+        self._last_render_key = None
+        # PSD di Welch di entrambi i canali: (3, 2, bin), media + max/min hold
+        self.last_psd = None
+        self.last_psd_freq_hz = np.array([])
+        self.hold_curves = self._add_hold_curves()
+        # Persistenza: una mappa per canale, sommate a schermo nei colori delle curve
+        self.persistence_maps = (PersistenceMap(), PersistenceMap())
+        self.persist_images = (pg.ImageItem(), pg.ImageItem())
+        for image, color in zip(self.persist_images, ((0, 255, 0), (0, 0, 255))):
+            image.setLookupTable(pg.ColorMap([0.0, 1.0], [(0, 0, 0), color]).getLookupTable(nPts=256))
+            image.setCompositionMode(QPainter.CompositionMode.CompositionMode_Plus)
+        self._persist_write_index = 0
         QTimer.singleShot(0, self.initialize_scales_combined)
 
     def initialize_scales_combined(self):
-        if self.display_mode == "Time D.":
+        if self.display_mode in TIME_MODES:
             self.plot_widget.setLogMode(x=False, y=False)
             self.plot_widget.setYRange(-1, 1, padding=0.05)
             self.plot_widget.setXRange(0, 0.1, padding=0.05)
@@ -502,177 +690,265 @@ class CombinedOscilloscope(QWidget):
             
             self.plot_widget.setYRange(np.log10(1e-10), 0, padding=0.05)
 
+        elif self.display_mode == "PSD":
+            setup_psd_axes(self.plot_widget, self.sampling_rate_hz, self.gui_funcs.signal_source.psd_units)
+
+        elif self.display_mode == "Waterfall":
+            setup_waterfall_axes(self.plot_widget, self.sampling_rate_hz,
+                                 WATERFALL_HISTORY * self.gui_funcs.signal_source.fft_interval_s)
+
         self._initial_scale_set = True
+        self._last_render_key = None
 
     @Slot()
     def update_voltage_scale(self):
-        if not (hasattr(self.gui_funcs.ui, 'voltdiv_spbx') and hasattr(self.gui_funcs.ui, 'voltdiv_cb')):
-            return
-        value = self.gui_funcs.ui.voltdiv_spbx.value()
-        unit_text = self.gui_funcs.ui.voltdiv_cb.currentText()
-        multiplier = 1.0
-        if unit_text == "mV":
-            multiplier = 1e-3
-        elif unit_text == "uV":
-            multiplier = 1e-6
-
-        if self.display_mode == "Time D.":
-            volt_range_total = 10 * value * multiplier
-            self.plot_widget.setYRange(-volt_range_total / 2,
-                                       volt_range_total / 2, padding=0.05)
-            self.plot_widget.setLabel('left', 'Voltage', units=unit_text)
+        scale = self.gui_funcs.scale
+        if self.display_mode in TIME_MODES:
+            self.plot_widget.setYRange(-scale.total_volts / 2,
+                                       scale.total_volts / 2, padding=0.05)
+            self.plot_widget.setLabel('left', 'Voltage', units=scale.volt_unit)
+            self._update_persistence_range()
 
     @Slot()
     def update_time_scale(self):
-        if not (hasattr(self.gui_funcs.ui, 'timediv_spbx') and hasattr(self.gui_funcs.ui, 'timediv_cb')):
-            return
-        time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-        unit_text = self.gui_funcs.ui.timediv_cb.currentText()
-        unit_multiplier = 1.0
-        if unit_text == "ms":
-            unit_multiplier = 1e-3
-        elif unit_text == "us":
-            unit_multiplier = 1e-6
-
-        if self.display_mode == "Time D.":
-            total_display_window_time = time_per_div_val * unit_multiplier * 10
-            self.time_values_for_plot = np.linspace(
-                0, total_display_window_time, self.buffer_size)
+        scale = self.gui_funcs.scale
+        if self.display_mode in TIME_MODES:
+            self.time_values_for_plot = scale.x_axis(self.buffer_size)
             self.plot_widget.setXRange(
-                0, total_display_window_time, padding=0.01)
-            self.plot_widget.setLabel('bottom', 'Time', units=unit_text)
+                0, scale.total_time, padding=0.01)
+            self.plot_widget.setLabel('bottom', 'Time', units=scale.time_unit)
+            self._set_sweep_frame(scale.total_time)
+            self._update_persistence_range()
+
+    def _update_persistence_range(self):
+        scale = self.gui_funcs.scale
+        for persistence in self.persistence_maps:
+            persistence.set_range(0, scale.total_time, -scale.total_volts / 2, scale.total_volts / 2)
+
+    def _set_sweep_frame(self, total_display_window_time):
+        # Lo sweep copre la finestra Time/Div con il trigger al centro
+        n_samples = max(2, int(round(total_display_window_time * self.sampling_rate_hz)))
+        n = min(self.hub.depth, n_samples)
+        handler = self.trigger_handler
+        if n != handler.pre_trigger_samples + handler.post_trigger_samples:
+            handler.set_frame(n // 2, n - n // 2)
+            handler.rearm()
+        if self.y1_data is not None and self.y1_data.shape[0] != n:
+            self.y1_data = self.y2_data = None
 
     @Slot(int)
     def on_pos_edge_trigger_changed(self, state):
-        self.trigger_handler1.set_pos_edge_enabled(state == 2)
-        self.trigger_handler2.set_pos_edge_enabled(state == 2)
+        # Il trigger condiviso è aggiornato da GuiFunctions; qui si torna al live
         if state == 0:
-            self.trigger_handler1.unfreeze()
-            self.trigger_handler2.unfreeze()
+            self.y1_data = self.y2_data = None
 
     @Slot(int)
     def on_neg_edge_trigger_changed(self, state):
-        self.trigger_handler1.set_neg_edge_enabled(state == 2)
-        self.trigger_handler2.set_neg_edge_enabled(state == 2)
         if state == 0:
-            self.trigger_handler1.unfreeze()
-            self.trigger_handler2.unfreeze()
-
-    def center_display_at_trigger(self, trigger_idx, signal_num):
-        if signal_num == 1 and not self.trigger_handler1.is_frozen:
-            return
-        if signal_num == 2 and not self.trigger_handler2.is_frozen:
-            return
-            
-        points_before = self.buffer_size // 2
-        points_after = self.buffer_size - points_before
-        
-        centered_data1 = np.zeros_like(self.y1_data)
-        centered_data2 = np.zeros_like(self.y2_data)
-        
-        for i in range(points_before):
-            idx = (trigger_idx - points_before + i) % self.buffer_size
-            centered_data1[i] = self.y1_data[idx]
-            centered_data2[i] = self.y2_data[idx]
-            
-        for i in range(points_after):
-            idx = (trigger_idx + i) % self.buffer_size
-            centered_data1[points_before + i] = self.y1_data[idx]
-            centered_data2[points_before + i] = self.y2_data[idx]
-            
-        self.y1_data = centered_data1
-        self.y2_data = centered_data2
-        
-        if self.display_mode == "Time D.":
-            time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-            unit_text_time = self.gui_funcs.ui.timediv_cb.currentText()
-            multiplier_time = 1.0
-            if unit_text_time == "ms":
-                multiplier_time = 1e-3
-            elif unit_text_time == "us":
-                multiplier_time = 1e-6
-            total_display_window_time = time_per_div_val * multiplier_time * 10
-            
-            trigger_time = total_display_window_time / 2
-            self.plot_widget.setXRange(0, total_display_window_time, padding=0.05)
-            
-            signal1_range = np.ptp(self.y1_data)
-            signal2_range = np.ptp(self.y2_data)
-            max_signal_range = max(signal1_range, signal2_range)
-            
-            current_volt_div = self.gui_funcs.ui.voltdiv_spbx.value()
-            unit_text_volt = self.gui_funcs.ui.voltdiv_cb.currentText()
-            volt_multiplier = 1.0
-            if unit_text_volt == "mV":
-                volt_multiplier = 1e-3
-            elif unit_text_volt == "uV":
-                volt_multiplier = 1e-6
-                
-            current_volt_range = current_volt_div * volt_multiplier * 10
-            if max_signal_range > current_volt_range * 0.8:
-                new_volt_div = (max_signal_range / 8) / volt_multiplier
-                self.gui_funcs.ui.voltdiv_spbx.setValue(new_volt_div)
-            elif max_signal_range < current_volt_range * 0.2:
-                new_volt_div = (max_signal_range / 4) / volt_multiplier
-                self.gui_funcs.ui.voltdiv_spbx.setValue(new_volt_div)
-                
-            self.update_voltage_scale()
-            self.update_display()
-
-    @Slot(float, float)
-    def on_new_data(self, value1, value2):
-        if not (self.trigger_handler1.is_frozen or self.trigger_handler2.is_frozen):
-            self.y1_data[self.ptr] = value1
-            self.y2_data[self.ptr] = value2
-            self.ptr = (self.ptr + 1) % self.buffer_size
-            
-            if self.display_mode == "Time D.":
-                trigger_idx1 = self.trigger_handler1.check_trigger(self.y1_data)
-                trigger_idx2 = self.trigger_handler2.check_trigger(self.y2_data)
-                
-                if trigger_idx1 is not None:
-                    self.center_display_at_trigger(trigger_idx1, 1)
-                elif trigger_idx2 is not None:
-                    self.center_display_at_trigger(trigger_idx2, 2)
+            self.y1_data = self.y2_data = None
+
+    def _showing_sweep(self):
+        # Con un trigger attivo si visualizza l'ultimo sweep catturato (se c'è)
+        return self.trigger_handler.trigger_enabled and self.y1_data is not None
+
+    def _take_sweep(self):
+        sweep = self.trigger_handler.sweep_since(self._sweep_generation)
+        if sweep is not None:
+            self._sweep_generation = sweep[0]
+            self.center_display_at_trigger(sweep[1], sweep[3])
+
+    def _plot_time_window(self, total_display_window_time):
+        width = max(int(self.plot_widget.width()), 100)
+        if self._showing_sweep():
+            x = self._sweep_x_axis(self._sweep_frame.shape[1])
+            values = self._sweep_frame
+        else:
+            # Live: legge dalla piramide min/max il livello adatto alla Time/Div
+            n_samples = max(2, int(round(total_display_window_time * self.sampling_rate_hz)))
+            offsets, values = self.pyramid.read_latest(n_samples, width)
+            x = offsets / self.sampling_rate_hz
+        # Una coppia min/max per colonna di pixel, per entrambi i canali in una passata
+        self.time_values_for_plot, values = minmax_decimate(x, values, width)
+        self.curve1.setData(self.time_values_for_plot, values[0])
+        self.curve2.setData(self.time_values_for_plot, values[1])
+
+    def _sweep_x_axis(self, n_points):
+        # Asse x spostato della frazione di campione del trigger (come Oscilloscope)
+        plot_x_time = self.gui_funcs.scale.x_axis(n_points)
+        if self._sweep_offset == 0.0 or n_points < 2:
+            return plot_x_time
+        return plot_x_time - self._sweep_offset * (plot_x_time[1] - plot_x_time[0])
+
+    def center_display_at_trigger(self, trigger_index, offset=0.0):
+        # trigger_index è l'indice assoluto nell'hub del trigger (sulla sorgente scelta),
+        # offset la posizione frazionaria del trigger rispetto a esso
+        handler = self.trigger_handler
+        n = handler.pre_trigger_samples + handler.post_trigger_samples
+        start_index = trigger_index - handler.pre_trigger_samples
+        if start_index < self.hub.write_index - self.hub.available:
+            return  # Sweep già sovrascritto nella memoria
+
+        # Una sola fetta del ring specchiato per entrambi i canali, copiata nel
+        # buffer (2, n) preallocato che sopravvive al riavvolgimento della memoria
+        frame = self.hub.window(start_index, n)
+        first_sweep = self.y1_data is None
+        if self._sweep_frame is None or self._sweep_frame.shape != frame.shape:
+            self._sweep_frame = np.empty_like(frame)
+        np.copyto(self._sweep_frame, frame)
+        self.y1_data, self.y2_data = self._sweep_frame
+        self._sweep_offset = offset
+        self._frozen_generation += 1
+
+        # Autorange solo sul primo sweep dopo l'armamento e solo su questo grafico
+        if self.display_mode == "Time D." and first_sweep:
+            span = self.gui_funcs.scale.autorange_volts(np.ptp(self._sweep_frame, axis=1).max())
+            if span is not None:
+                self.plot_widget.setYRange(-span / 2, span / 2, padding=0.05)
 
     @Slot(np.ndarray, np.ndarray, np.ndarray)
     def on_new_fft_data(self, x_freq_hz, fft_mag1, fft_mag2):
-        if fft_mag1.size == self.fft_len:
-            self.last_fft_mag1 = fft_mag1
-        else:
-            print(f"Size mismatch - expected {self.fft_len}, got {fft_mag1.size}")
-            
-        if fft_mag2.size == self.fft_len:
-            self.last_fft_mag2 = fft_mag2
-        else:
-            print(f"Size mismatch - expected {self.fft_len}, got {fft_mag2.size}")
-            
-        if x_freq_hz.size == self.fft_len:
-            self.last_x_freq_hz = x_freq_hz
+        # Arriva solo mentre il grafico è abbonato alla FFT (vedi SignalSource.subscribe)
+        self._fft_generation += 1
+        self.last_fft_mag1 = fft_mag1
+        self.last_fft_mag2 = fft_mag2
+        self.last_x_freq_hz = x_freq_hz
+        if self.display_mode == "Waterfall":
+            self.waterfalls[0].push(fft_mag1)
+            self.waterfalls[1].push(fft_mag2)
+
+    def _plot_waterfall(self):
+        for image, ring in zip(self.waterfall_images, self.waterfalls):
+            show_waterfall(image, ring, self.sampling_rate_hz / 2, self.signal_source.fft_interval_s)
+
+    def _set_waterfall_enabled(self, enabled):
+        items = self.plot_widget.getPlotItem().items
+        for image, ring in zip(self.waterfall_images, self.waterfalls):
+            ring.clear()
+            if enabled and image not in items:
+                self.plot_widget.addItem(image)
+                image.setZValue(-2)
+            elif not enabled and image in items:
+                self.plot_widget.removeItem(image)
+
+    def _add_hold_curves(self):
+        # Max e min hold di CH1 e poi di CH2
+        pens = hold_pens('g') + hold_pens('b')
+        return tuple(self.plot_widget.plot(pen=pen) for pen in pens)
+
+    @Slot(np.ndarray, np.ndarray)
+    def on_new_psd_data(self, x_freq_hz, traces):
+        self._psd_generation += 1
+        self.last_psd_freq_hz = x_freq_hz
+        self.last_psd = traces
+
+    def _plot_psd(self):
+        curves = (self.curve1, self.curve2)
+        if self.last_psd is None:
+            for curve in curves + self.hold_curves:
+                curve.setData([], [])
+            return
+        x = self.last_psd_freq_hz
+        holds = (self.gui_funcs.psd_max_hold, self.gui_funcs.psd_min_hold)
+        shown_rows = [AVERAGE] + [row for row, shown in zip((MAX_HOLD, MIN_HOLD), holds) if shown]
+        for channel, curve in enumerate(curves):
+            curve.setData(x, self.last_psd[AVERAGE, channel])
+            hold_curves = self.hold_curves[2 * channel:2 * channel + 2]
+            for hold_curve, row, shown in zip(hold_curves, (MAX_HOLD, MIN_HOLD), holds):
+                if shown:
+                    hold_curve.setData(x, self.last_psd[row, channel])
+                else:
+                    hold_curve.setData([], [])
+        low, high = psd_y_range(self.last_psd[shown_rows], self.gui_funcs.signal_source.psd_units)
+        self.plot_widget.setYRange(low, high, padding=0.02)
+
+    def _accumulate_persistence(self):
+        # Entrambi i canali accumulano gli stessi sweep (o la finestra più recente senza trigger)
+        handler = self.trigger_handler
+        self._collected_generation, indices, offsets = handler.collected_since(self._collected_generation)
+        new_samples = self.hub.write_index - self._persist_write_index
+        self._persist_write_index = self.hub.write_index
+        if new_samples <= 0:
+            return
+        n = handler.pre_trigger_samples + handler.post_trigger_samples
+        if not handler.trigger_enabled and self.hub.available >= n:
+            indices = np.array([self.hub.write_index - handler.post_trigger_samples])
+            offsets = np.zeros(1)
+        x_axis = self.gui_funcs.scale.x_axis(n)
+        for channel, persistence in enumerate(self.persistence_maps):
+            x, y = sweep_traces(self.hub, channel, indices, offsets, handler.pre_trigger_samples,
+                                n, x_axis)
+            persistence.accumulate(x, y, new_samples / self.sampling_rate_hz)
+
+    def _plot_persistence(self):
+        for image, persistence in zip(self.persist_images, self.persistence_maps):
+            image.setImage(persistence.image(), autoLevels=True)
+            image.setRect(QRectF(persistence.t_min, persistence.v_min,
+                                 persistence.t_max - persistence.t_min,
+                                 persistence.v_max - persistence.v_min))
+
+    def _set_persistence_enabled(self, enabled):
+        self._persist_write_index = self.hub.write_index
+        self._collected_generation = self.trigger_handler.sweep_generation
+        items = self.plot_widget.getPlotItem().items
+        for image, persistence in zip(self.persist_images, self.persistence_maps):
+            persistence.clear()
+            if enabled and image not in items:
+                self.plot_widget.addItem(image)
+                image.setZValue(-2)
+            elif not enabled and image in items:
+                self.plot_widget.removeItem(image)
+        if enabled:
+            self.curve1.setData([], [])
+            self.curve2.setData([], [])
+
+    def _render_key(self, total_display_window_time):
+        if self.display_mode == "FFT":
+            data_generation = ('fft', self._fft_generation)
+        elif self.display_mode == "PSD":
+            data_generation = ('psd', self._psd_generation,
+                               self.gui_funcs.psd_max_hold, self.gui_funcs.psd_min_hold)
+        elif self.display_mode == "Waterfall":
+            data_generation = ('waterfall', tuple(w.generation for w in self.waterfalls))
+        elif self.display_mode == "Persist.":
+            data_generation = ('persist', tuple(p.generation for p in self.persistence_maps))
+        elif self._showing_sweep():
+            data_generation = ('frozen', self._frozen_generation)
         else:
-            print(f"Size mismatch - expected {self.fft_len}, got {x_freq_hz.size}")
+            data_generation = ('live', self.hub.write_index)
+        return (self.display_mode, data_generation, total_display_window_time,
+                int(self.plot_widget.width()))
 
     def update_display(self):
         if not self._initial_scale_set:
             self.initialize_scales_combined()
             return
 
+        total_display_window_time = self.gui_funcs.scale.total_time
+        if self.display_mode == "Time D.":
+            self._take_sweep()
+        elif self.display_mode == "Persist.":
+            self._accumulate_persistence()
+        # Niente di nuovo da disegnare: nessun dato, scala, modo o dimensione cambiati
+        render_key = self._render_key(total_display_window_time)
+        if render_key == self._last_render_key:
+            return
+        self._last_render_key = render_key
+
         if self.display_mode == "Time D.":
-            time_per_div_val = self.gui_funcs.ui.timediv_spbx.value()
-            unit_text_time = self.gui_funcs.ui.timediv_cb.currentText()
-            multiplier_time = 1.0
-            if unit_text_time == "ms":
-                multiplier_time = 1e-3
-            elif unit_text_time == "us":
-                multiplier_time = 1e-6
-            total_display_window_time = time_per_div_val * multiplier_time * 10
-
-            self.time_values_for_plot = np.linspace(0, total_display_window_time, self.buffer_size)
-            self.curve1.setData(self.time_values_for_plot, self.y1_data)
-            self.curve2.setData(self.time_values_for_plot, self.y2_data)
+            self._plot_time_window(total_display_window_time)
             
             self.plot_widget.setXRange(0, total_display_window_time, padding=0.02)
 
+        elif self.display_mode == "Persist.":
+            self._plot_persistence()
+            self.plot_widget.setXRange(0, total_display_window_time, padding=0.02)
+
+        elif self.display_mode == "PSD":
+            self._plot_psd()
+
+        elif self.display_mode == "Waterfall":
+            self._plot_waterfall()
+
         elif self.display_mode == "FFT":
             if self.last_x_freq_hz.size > 0:
                 magnitude1 = np.maximum(self.last_fft_mag1, 1e-10)
@@ -692,24 +968,29 @@ class CombinedOscilloscope(QWidget):
                 self.curve2.setData([], [])
 
     def reset_view(self):
-        if self.display_mode == "Time D.":
-            self.y1_data = np.zeros(self.buffer_size, dtype=np.float64)
-            self.y2_data = np.zeros(self.buffer_size, dtype=np.float64)
-            self.ptr = 0
+        if self.display_mode in TIME_MODES:
+            self.y1_data = None
+            self.y2_data = None
+            for curve in self.hold_curves:
+                curve.setData([], [])
         else:
             self.plot_widget.clear()
             self.curve1 = self.plot_widget.plot(pen=pg.mkPen('g', width=2), name='Channel 1')
             self.curve2 = self.plot_widget.plot(pen=pg.mkPen('b', width=2), name='Channel 2')
+            self.hold_curves = self._add_hold_curves()
             
         self._initial_scale_set = False
         self.initialize_scales_combined()
 
     @Slot(str)
     def set_display_mode(self, mode):
-        if mode in ["Time D.", "FFT"]:
+        if mode in DISPLAY_MODES:
             if self.display_mode != mode:
                 self.display_mode = mode
+                self._set_persistence_enabled(mode == "Persist.")
                 self.reset_view()
+                # Dopo reset_view, che svuota il grafico fuori dal dominio del tempo
+                self._set_waterfall_enabled(mode == "Waterfall")
         else:
             print(f"Unknown mode: {mode}")
 
@@ -0,0 +1,195 @@
+import os
+
+import numpy as np
+from src.signal_generator import SimulatedSignalGenerator
+from src.truesignal_protocol import FrameParser, DEFAULT_SAMPLES_PER_FRAME
+
+try:
+    import serial  # pyserial, necessario solo per il backend USB
+except ImportError:
+    serial = None
+
+
+class AcquisitionBackend:
+    """Common block-read API shared by every data source.
+
+    read_block() returns an (N, channels) float64 array in volts; N may be
+    smaller than requested (or zero) when the source has nothing ready.
+    Backends with paced_by_device = False are paced by AcquisitionWorker
+    against the wall clock, the others are paced by their own blocking reads.
+    """
+
+    name = "base"
+    channels = 2
+    paced_by_device = False
+
+    def __init__(self, sampling_rate_hz):
+        if sampling_rate_hz <= 0:
+            raise ValueError("Sampling rate must be positive.")
+        self.sampling_rate_hz = float(sampling_rate_hz)
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read_block(self, max_samples):
+        raise NotImplementedError
+
+    def _empty_block(self):
+        return np.empty((0, self.channels), dtype=np.float64)
+
+
+class SimulatedBackend(AcquisitionBackend):
+    """Synthetic random-walk/spike channels from SimulatedSignalGenerator."""
+
+    name = "sim"
+
+    def __init__(self, sampling_rate_hz=1000.0, seed=None):
+        super().__init__(sampling_rate_hz)
+        self.generator = SimulatedSignalGenerator(seed=seed)
+
+    def read_block(self, max_samples):
+        return self.generator.generate(max_samples)
+
+
+class FileReplayBackend(AcquisitionBackend):
+    """Replays a recorded capture, looping at the end by default.
+
+    Accepts the text files written by RECORD > Start Recording
+    ("Channel1,Channel2" header, one comma-separated pair per line) or a
+    .npy file holding an (N, 2) array.
+    """
+
+    name = "replay"
+
+    def __init__(self, file_path, sampling_rate_hz=1000.0, loop=True):
+        super().__init__(sampling_rate_hz)
+        self.file_path = file_path
+        self.loop = loop
+        self.data = None
+        self.position = 0
+
+    def open(self):
+        if self.data is not None:
+            return
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(f"Replay file not found: {self.file_path}")
+        if self.file_path.lower().endswith(".npy"):
+            data = np.load(self.file_path)
+        else:
+            data = np.loadtxt(self.file_path, delimiter=",", skiprows=1, ndmin=2)
+        if data.ndim != 2 or data.shape[1] < self.channels or data.shape[0] == 0:
+            raise ValueError(f"Replay file must contain at least {self.channels} columns of samples.")
+        self.data = np.ascontiguousarray(data[:, :self.channels], dtype=np.float64)
+        self.position = 0
+
+    @property
+    def is_finished(self):
+        return not self.loop and self.data is not None and self.position >= self.data.shape[0]
+
+    def read_block(self, max_samples):
+        if self.data is None:
+            self.open()
+        total = self.data.shape[0]
+        if self.position >= total:
+            if not self.loop:
+                return self._empty_block()
+            self.position = 0
+
+        end = self.position + max_samples
+        if end <= total:
+            block = self.data[self.position:end].copy()
+            self.position = end
+            return block
+        if not self.loop:
+            block = self.data[self.position:].copy()
+            self.position = total
+            return block
+
+        # Riavvolge il file: al massimo una concatenazione per blocco se il file è corto
+        indices = np.arange(self.position, end) % total
+        self.position = end % total
+        return self.data[indices]
+
+
+class SerialBackend(AcquisitionBackend):
+    """TrueSignal USB hardware seen as a serial port.
+
+    The device streams fixed-size binary frames (see truesignal_protocol).
+    Each read pulls everything the port has buffered straight into the
+    parser's preallocated bytearray, and all complete frames are decoded at
+    once. volts_per_count converts raw int16 counts to volts.
+    """
+
+    name = "serial"
+    paced_by_device = True
+
+    def __init__(self, port, sampling_rate_hz=1000.0, baudrate=2000000,
+                 volts_per_count=10.0 / 32768, timeout_s=0.05,
+                 samples_per_frame=DEFAULT_SAMPLES_PER_FRAME, capacity_frames=1024):
+        super().__init__(sampling_rate_hz)
+        self.port = port
+        self.baudrate = baudrate
+        self.volts_per_count = volts_per_count
+        self.timeout_s = timeout_s
+        self.connection = None
+        self.parser = FrameParser(samples_per_frame, self.channels, capacity_frames)
+        # Campioni già decodificati oltre max_samples, restituiti dalla lettura successiva
+        self._pending = np.empty((0, self.channels), dtype='<i2')
+
+    def open(self):
+        if serial is None:
+            raise RuntimeError("pyserial is not installed: the serial backend is not available.")
+        if self.connection is None:
+            self.connection = serial.Serial(self.port, self.baudrate, timeout=self.timeout_s)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self._pending = self._pending[:0]
+
+    def read_block(self, max_samples):
+        if self.connection is None:
+            self.open()
+        counts = self._pending
+        missing = max_samples - counts.shape[0]
+        if missing > 0:
+            # Legge i byte disponibili fino ai frame interi che servono per max_samples,
+            # almeno un frame (bloccante fino al timeout); il resto aspetta nella porta
+            frame_size = self.parser.frame_size
+            needed = -(-missing // self.parser.samples_per_frame) * frame_size
+            free = self.parser.receive_view()
+            wanted = min(len(free), needed, max(self.connection.in_waiting, frame_size))
+            n_read = self.connection.readinto(free[:wanted])
+            self.parser.commit(n_read)
+            new_counts = self.parser.parse()
+            if new_counts.shape[0]:
+                counts = np.concatenate((counts, new_counts)) if counts.shape[0] else new_counts
+        # Un frame decodificato può superare max_samples: l'eccedenza resta per la prossima
+        # lettura, copiata perché parse() restituisce una vista sul buffer di ricezione
+        self._pending = counts[max_samples:].copy()
+        counts = counts[:max_samples]
+        if counts.shape[0] == 0:
+            return self._empty_block()
+        return counts * self.volts_per_count
+
+    def stats(self):
+        """Frame counters of the link: ok, dropped (sequence gaps), corrupt (bad CRC)."""
+        return self.parser.stats()
+
+
+BACKENDS = {
+    SimulatedBackend.name: SimulatedBackend,
+    FileReplayBackend.name: FileReplayBackend,
+    SerialBackend.name: SerialBackend,
+}
+
+
+def create_backend(kind, **options):
+    """Build a backend by name ("sim", "replay" or "serial")."""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown acquisition backend: {kind}. Choose from {sorted(BACKENDS)}.")
+    return BACKENDS[kind](**options)
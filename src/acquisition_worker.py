@@ -0,0 +1,256 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from src.fft_engine import FFTEngine, WINDOW_TYPES
+from src.ring_buffer import write_block_to_ring
+from src.welch import WelchPSD
+
+
+class AcquisitionWorker:
+    """Runs acquisition from an AcquisitionBackend and FFT on a background thread.
+
+    Blocks are queued for the GUI, which drains them at display rate with
+    drain(). The counters samples_produced, samples_consumed and
+    samples_dropped make it possible to check that a busy GUI does not lose
+    data: produced == consumed + dropped + pending at any time.
+    """
+
+    def __init__(self, backend, block_size, fft_size,
+                 fft_interval_s=0.1, max_backlog_s=10.0, fft_len=None, fft_window="Hann"):
+        self.backend = backend
+        self.sampling_rate_hz = backend.sampling_rate_hz
+        self.block_size = int(block_size)
+        self.block_period_s = self.block_size / self.sampling_rate_hz
+        self.fft_interval_s = fft_interval_s
+        self.max_backlog_samples = int(max_backlog_s * self.sampling_rate_hz)
+
+        self.samples_produced = 0
+        self.samples_consumed = 0
+        self.samples_dropped = 0
+
+        self._blocks = deque()
+        self._pending_samples = 0
+        self._lock = threading.Lock()
+
+        # Buffer circolari privati del thread per il calcolo FFT: fft_size campioni
+        # per canale, trasformati su fft_len punti (zero padding se fft_len > fft_size)
+        self.fft_size = int(fft_size)
+        self.fft = FFTEngine(self.fft_size, fft_len, fft_window,
+                             channels=backend.channels, sampling_rate_hz=self.sampling_rate_hz)
+        self._fft_rings = np.zeros((backend.channels, self.fft_size), dtype=np.float64)
+        self._fft_ptr = 0
+        # Ultimo spettro pubblicato per la GUI, copiato sotto lock in un array riusato
+        self._fft_published = np.zeros_like(self.fft.magnitude)
+        self._fft_ready = False
+        self._fft_window_request = None
+        # Canali di cui la GUI vuole lo spettro (vuoto = nessuna FFT); tutti finché
+        # non li sceglie con set_fft_channels
+        self.fft_channels = tuple(range(backend.channels))
+
+        # PSD di Welch aggiornata a ogni blocco, solo se qualcuno la visualizza;
+        # le impostazioni chieste dalla GUI sono applicate dal thread del worker
+        self.psd = WelchPSD(window=fft_window, channels=backend.channels,
+                            sampling_rate_hz=self.sampling_rate_hz)
+        self.psd_enabled = False
+        self._psd_request = None
+        self._psd_published = np.zeros_like(self.psd.traces)
+        self._psd_freqs = self.psd.freqs
+        self._psd_enbw_hz = self.psd.enbw_hz
+        self._psd_ready = False
+        self._psd_published_generation = self.psd.generation
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # Apre il backend nel thread chiamante così gli errori arrivano subito alla GUI
+        self.backend.open()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="AcquisitionWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.backend.close()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        t0 = time.perf_counter()
+        next_fft = t0 + self.fft_interval_s
+        while not self._stop_event.is_set():
+            if self.backend.paced_by_device:
+                # Il dispositivo detta il ritmo: read_block si blocca fino al timeout
+                self._produce(self.backend.read_block(self.block_size))
+            else:
+                # Ritmo in tempo reale: legge tutti i campioni maturati da t0
+                due = int((time.perf_counter() - t0) * self.sampling_rate_hz) - self.samples_produced
+                while due >= self.block_size:
+                    block = self.backend.read_block(self.block_size)
+                    self._produce(block)
+                    if block.shape[0] < self.block_size:
+                        # La sorgente non ha altri campioni (es. replay senza loop finito):
+                        # l'orologio riparte da adesso, così gli arretrati non crescono
+                        # e ogni giro fa una sola lettura
+                        t0 = time.perf_counter() - self.samples_produced / self.sampling_rate_hz
+                        break
+                    due -= self.block_size
+
+            now = time.perf_counter()
+            if now >= next_fft:
+                self._compute_fft()
+                next_fft = now + self.fft_interval_s
+
+            if not self.backend.paced_by_device:
+                self._stop_event.wait(self.block_period_s)
+
+    def _produce(self, block):
+        n_samples = block.shape[0]
+        if n_samples == 0:
+            return
+        for channel, ring in enumerate(self._fft_rings):
+            ptr = write_block_to_ring(ring, self._fft_ptr, block[:, channel])
+        self._fft_ptr = ptr
+        if self.psd_enabled:
+            self._apply_psd_request()
+            self.psd.update(block)
+
+        with self._lock:
+            self._blocks.append(block)
+            self._pending_samples += n_samples
+            self.samples_produced += n_samples
+            # Se la GUI resta bloccata troppo a lungo scarta i blocchi più vecchi, contandoli
+            while self._pending_samples > self.max_backlog_samples and len(self._blocks) > 1:
+                dropped = self._blocks.popleft()
+                self._pending_samples -= dropped.shape[0]
+                self.samples_dropped += dropped.shape[0]
+
+    def _compute_fft(self):
+        with self._lock:
+            window, self._fft_window_request = self._fft_window_request, None
+        if window is not None:
+            self.fft.configure(window=window)
+        channels = self.fft_channels
+        if channels:
+            # Si trasformano solo i canali dal primo all'ultimo richiesto (una vista, nessuna copia);
+            # le righe degli altri canali pubblicate restano quelle dell'ultima volta
+            rows = slice(channels[0], channels[-1] + 1)
+            magnitude = self.fft.transform(self._fft_rings[rows], ring_ptr=self._fft_ptr)
+            with self._lock:
+                np.copyto(self._fft_published[rows], magnitude)
+                self._fft_ready = True
+        if self.psd_enabled:
+            self._publish_psd()
+
+    def _apply_psd_request(self):
+        with self._lock:
+            settings, self._psd_request = self._psd_request, None
+        if settings is not None:
+            try:
+                self.psd.configure(**settings)
+            except ValueError as e:
+                print(f"Warning: PSD settings not applied: {e}")
+
+    def _publish_psd(self):
+        # Pubblicata alla cadenza della FFT, solo se sono arrivati segmenti nuovi
+        psd = self.psd
+        if psd.segments == 0 or psd.generation == self._psd_published_generation:
+            return
+        self._psd_published_generation = psd.generation
+        with self._lock:
+            if self._psd_published.shape != psd.traces.shape:
+                # Nuova lunghezza dei segmenti: si rialloca solo al cambio di impostazioni
+                self._psd_published = np.empty_like(psd.traces)
+            np.copyto(self._psd_published, psd.traces)
+            self._psd_freqs, self._psd_enbw_hz = psd.freqs, psd.enbw_hz
+            self._psd_ready = True
+
+    def set_psd_enabled(self, enabled):
+        """Run the Welch PSD on every block (True) or not at all (False); enabling restarts it."""
+        if enabled and not self.psd_enabled:
+            self.configure_psd()
+        self.psd_enabled = enabled
+
+    def configure_psd(self, **settings):
+        """WelchPSD.configure() settings, applied by the worker thread before the next block.
+
+        Called with no settings it only restarts the averages.
+        """
+        with self._lock:
+            pending = self._psd_request or {}
+            pending.update(settings)
+            self._psd_request = pending
+
+    def set_fft_channels(self, channels):
+        """Channels whose spectrum is computed from the next FFT tick on; none stops the FFT."""
+        channels = tuple(sorted(set(channels)))
+        if channels and (channels[0] < 0 or channels[-1] >= self.backend.channels):
+            raise ValueError(f"FFT channels {channels} out of range for {self.backend.channels} channels.")
+        # Un solo assegnamento: il thread del worker legge sempre una tupla completa
+        self.fft_channels = channels
+
+    def set_fft_window(self, window):
+        """Window used from the next FFT (and Welch segment) on; applied by the worker thread."""
+        if window not in WINDOW_TYPES:
+            raise ValueError(f"Unknown FFT window: {window}. Choose from {WINDOW_TYPES}.")
+        with self._lock:
+            self._fft_window_request = window
+        self.configure_psd(window=window)
+
+    def drain(self):
+        """Return every queued sample as one (N, channels) array, or None."""
+        with self._lock:
+            if not self._blocks:
+                return None
+            blocks = list(self._blocks)
+            self._blocks.clear()
+            self.samples_consumed += self._pending_samples
+            self._pending_samples = 0
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+    def take_fft(self, out=None):
+        """Copy the newest spectra (channels, fft.n_bins) into out once, or return None if nothing new.
+
+        Without out a new array is returned.
+        """
+        with self._lock:
+            if not self._fft_ready:
+                return None
+            self._fft_ready = False
+            if out is None:
+                return self._fft_published.copy()
+            np.copyto(out, self._fft_published)
+        return out
+
+    def take_psd(self, out=None):
+        """(freqs, traces, enbw_hz) of the newest Welch PSD once, or None if nothing new.
+
+        traces is (3, channels, bins) in V²/Hz (see WelchPSD), copied into
+        out if it has the same shape, otherwise into a new array.
+        """
+        with self._lock:
+            if not self._psd_ready:
+                return None
+            self._psd_ready = False
+            if out is None or out.shape != self._psd_published.shape:
+                out = self._psd_published.copy()
+            else:
+                np.copyto(out, self._psd_published)
+            return self._psd_freqs, out, self._psd_enbw_hz
+
+    def stats(self):
+        with self._lock:
+            return {
+                'produced': self.samples_produced,
+                'consumed': self.samples_consumed,
+                'dropped': self.samples_dropped,
+                'pending': self._pending_samples,
+            }
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class DataHub:
+    """Single ring buffer shared by every oscilloscope widget.
+
+    Samples are stored channel-major in a mirrored ring: the sample with
+    absolute index i lives both at i % depth and at i % depth + depth. Any
+    window of up to `depth` samples is therefore one contiguous slice, and
+    readers get zero-copy views instead of keeping their own copies.
+
+    write_index counts every sample ever written and never wraps, so readers
+    can tell how much new data arrived since their last look.
+    """
+
+    def __init__(self, channels, depth, dtype=np.float64):
+        if depth <= 0:
+            raise ValueError("Hub depth must be positive.")
+        self.channels = channels
+        self.depth = depth
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros((channels, 2 * depth), dtype=dtype)
+        self.write_index = 0
+
+    @property
+    def available(self):
+        """Number of valid samples currently held (at most depth)."""
+        return min(self.write_index, self.depth)
+
+    def write(self, block):
+        """Append an (N, channels) block."""
+        n = block.shape[0]
+        if n == 0:
+            return
+        if n > self.depth:
+            # Solo gli ultimi `depth` campioni possono sopravvivere
+            self.write_index += n - self.depth
+            block = block[-self.depth:]
+            n = self.depth
+
+        data = block.T
+        pos = self.write_index % self.depth
+        first = min(n, self.depth - pos)
+        rest = n - first
+        for offset in (0, self.depth):
+            self._data[:, offset + pos:offset + pos + first] = data[:, :first]
+            if rest:
+                self._data[:, offset:offset + rest] = data[:, first:]
+        self.write_index += n
+
+    def window(self, start_index, n):
+        """View (channels, n) of the samples with absolute indices [start_index, start_index + n)."""
+        if n > self.depth:
+            raise ValueError(f"Window of {n} samples exceeds hub depth {self.depth}.")
+        if start_index < self.write_index - self.depth or start_index + n > self.write_index:
+            raise IndexError("Requested window is not in the hub anymore (or not yet written).")
+        pos = start_index % self.depth
+        return self._data[:, pos:pos + n]
+
+    def gather(self, start_indices, n, channel, out=None):
+        """Copy (k, n) of one channel: row j holds [start_indices[j], start_indices[j] + n).
+
+        Every window is contiguous in the mirrored ring (no wrap-around
+        handling), so all k rows are copied by a single np.take.
+        """
+        start_indices = np.asarray(start_indices, dtype=np.int64)
+        if n > self.depth:
+            raise ValueError(f"Window of {n} samples exceeds hub depth {self.depth}.")
+        if start_indices.size and (start_indices.min() < self.write_index - self.depth
+                                   or start_indices.max() + n > self.write_index):
+            raise IndexError("Requested window is not in the hub anymore (or not yet written).")
+        positions = (start_indices % self.depth)[:, None] + np.arange(n)
+        return np.take(self._data[channel], positions, out=out)
+
+    def latest(self, n):
+        """View (channels, n) of the newest n samples, oldest first.
+
+        Before n samples have been written the missing part reads as zeros.
+        """
+        n = min(n, self.depth)
+        end = self.write_index % self.depth + self.depth
+        return self._data[:, end - n:end]
+
+    def skip_to(self, index):
+        """Move write_index forward to index; the skipped samples are not valid data."""
+        if index > self.write_index:
+            self.write_index = index
+
+    def clear(self):
+        self._data.fill(0)
+        self.write_index = 0
@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def minmax_decimate(x, y, n_columns):
+    """Reduce a curve to one min/max pair per pixel column (peak detect).
+
+    x must be sorted; y is (N,) or (channels, N). The x range is split into
+    n_columns equal columns and every non-empty column becomes two points at
+    the same x, its minimum and its maximum, so a one-sample glitch is still
+    drawn as a vertical stroke. Curves that already have no more than two
+    points per column are returned unchanged.
+    """
+    n = x.shape[0]
+    if n_columns < 1 or n <= 2 * n_columns:
+        return x, y
+
+    y2 = y.reshape(1, n) if y.ndim == 1 else y
+    # Primo campione di ogni colonna (le colonne vuote vengono scartate)
+    boundaries = np.linspace(x[0], x[-1], n_columns + 1)[:-1]
+    starts = np.unique(np.searchsorted(x, boundaries, side='left'))
+    ends = np.empty_like(starts)
+    ends[:-1] = starts[1:] - 1
+    ends[-1] = n - 1
+
+    out = np.empty((y2.shape[0], 2 * starts.size), dtype=y2.dtype)
+    out[:, 0::2] = np.minimum.reduceat(y2, starts, axis=1)
+    out[:, 1::2] = np.maximum.reduceat(y2, starts, axis=1)
+    x_out = np.repeat((x[starts] + x[ends]) * 0.5, 2)
+    return x_out, (out[0] if y.ndim == 1 else out)
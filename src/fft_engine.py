@@ -0,0 +1,112 @@
+import numpy as np
+from src.ring_buffer import ordered_copy
+
+# Finestre come somme di coseni (forma periodica, adatta alla DFT)
+WINDOW_COEFFICIENTS = {
+    "Hann": (0.5, 0.5),
+    "Blackman-Harris": (0.35875, 0.48829, 0.14128, 0.01168),
+    "Flat-top": (0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368),
+    "Rectangular": (1.0,),
+}
+WINDOW_TYPES = tuple(WINDOW_COEFFICIENTS)
+
+# rfft(..., out=) esiste solo da NumPy 2.0
+RFFT_HAS_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+_windows = {}
+
+
+def window_vector(window_type, n):
+    """Read-only window of length n, built once per (type, length)."""
+    key = (window_type, n)
+    window = _windows.get(key)
+    if window is None:
+        if window_type not in WINDOW_COEFFICIENTS:
+            raise ValueError(f"Unknown FFT window: {window_type}. Choose from {WINDOW_TYPES}.")
+        phase = 2 * np.pi * np.arange(n) / n
+        window = np.zeros(n)
+        for j, a in enumerate(WINDOW_COEFFICIENTS[window_type]):
+            window += (-1) ** j * a * np.cos(j * phase)
+        window.flags.writeable = False
+        _windows[key] = window
+    return window
+
+
+class FFTEngine:
+    """Amplitude spectra of all channels in one batched rfft into preallocated arrays.
+
+    record_len samples per channel are windowed into a preallocated
+    (channels, fft_len) work array whose tail stays zero, so fft_len can
+    exceed the record (zero padding interpolates the spectrum, it does not
+    add resolution). Window, work, spectrum and magnitude arrays are reused
+    on every call, but NumPy's pocketfft still allocates its own scratch
+    buffers inside each rfft (about 17 KiB at 1024 points, see
+    benchmarks/fft_benchmark.py). Magnitudes are divided by the window's coherent gain:
+    a sinusoid centred on a bin reads its peak amplitude in volts whatever
+    the window.
+    """
+
+    def __init__(self, record_len, fft_len=None, window="Hann", channels=2, sampling_rate_hz=1.0):
+        self.channels = int(channels)
+        self.sampling_rate_hz = float(sampling_rate_hz)
+        self.record_len = 0
+        self.fft_len = 0
+        self.window_type = window
+        self.configure(record_len, fft_len, window)
+
+    @property
+    def n_bins(self):
+        return self.fft_len // 2 + 1
+
+    def configure(self, record_len=None, fft_len=None, window=None):
+        """Change record length, FFT length or window; None keeps the current setting.
+
+        The FFT length is never shorter than the record. Arrays are
+        reallocated only when a length changes.
+        """
+        record_len = int(record_len or self.record_len)
+        fft_len = int(fft_len or max(self.fft_len, record_len))
+        window = window or self.window_type
+        if record_len < 2:
+            raise ValueError("FFT record must have at least 2 samples.")
+        if fft_len < record_len:
+            raise ValueError(f"FFT length ({fft_len}) must not be shorter than the record ({record_len}).")
+        self.window = window_vector(window, record_len)
+        self.window_type = window
+        if (record_len, fft_len) != (self.record_len, self.fft_len):
+            self.record_len, self.fft_len = record_len, fft_len
+            self._work = np.zeros((self.channels, fft_len))
+            self._spectrum = np.empty((self.channels, self.n_bins), dtype=np.complex128)
+            self.magnitude = np.zeros((self.channels, self.n_bins))
+            self.freqs = np.fft.rfftfreq(fft_len, d=1.0 / self.sampling_rate_hz)
+            self.freqs.flags.writeable = False
+        # Guadagno coerente: x2 per lo spettro a un lato, tranne DC (e Nyquist se fft_len è pari)
+        self._scale = np.full(self.n_bins, 2.0 / self.window.sum())
+        self._scale[0] /= 2
+        if fft_len % 2 == 0:
+            self._scale[-1] /= 2
+
+    def transform(self, records, ring_ptr=None):
+        """Spectra of records (k, record_len) into self.magnitude[:k] (k, n_bins), returned.
+
+        k may be smaller than channels: only the first k rows of the work
+        arrays are used, so fewer channels cost proportionally less.
+        With ring_ptr, records are circular buffers written up to ring_ptr:
+        they are put back in time order first, so the window tapers the
+        oldest and newest samples and not the two sides of the write point.
+        """
+        k = records.shape[0]
+        work = self._work[:k, :self.record_len]
+        if ring_ptr is None:
+            np.multiply(records, self.window, out=work)
+        else:
+            ordered_copy(records, ring_ptr, out=work)
+            work *= self.window
+        spectrum, magnitude = self._spectrum[:k], self.magnitude[:k]
+        if RFFT_HAS_OUT:
+            np.fft.rfft(self._work[:k], axis=1, out=spectrum)
+        else:
+            spectrum[...] = np.fft.rfft(self._work[:k], axis=1)
+        np.abs(spectrum, out=magnitude)
+        magnitude *= self._scale
+        return magnitude
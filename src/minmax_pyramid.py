@@ -0,0 +1,92 @@
+import numpy as np
+from src.data_hub import DataHub
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max summary of a DataHub.
+
+    Level k (k >= 1) stores, for every bucket of factor**k consecutive
+    samples, the minimum and the maximum of each channel. Levels are filled
+    incrementally as complete buckets appear in the hub, so keeping them up
+    to date costs O(new samples). A window of any length can then be drawn
+    from the coarsest level that still gives at least max_points buckets,
+    which bounds the work by the number of pixels rather than the window.
+    """
+
+    def __init__(self, hub, factor=8, min_buckets=256):
+        if factor < 2:
+            raise ValueError("Pyramid factor must be at least 2.")
+        self.hub = hub
+        self.factor = factor
+        self.levels = []  # (bucket_size, mins DataHub, maxs DataHub)
+        bucket = factor
+        while hub.depth // bucket >= min_buckets:
+            depth = hub.depth // bucket
+            self.levels.append((bucket,
+                                DataHub(hub.channels, depth, hub.dtype),
+                                DataHub(hub.channels, depth, hub.dtype)))
+            bucket *= factor
+
+    def update(self):
+        """Fold the samples written to the hub since the last call into every level."""
+        src_mins = src_maxs = self.hub
+        for bucket, mins, maxs in self.levels:
+            target = src_mins.write_index // self.factor
+            new = target - mins.write_index
+            if new <= 0:
+                break
+            # Solo i bucket i cui campioni sono ancora presenti nel livello sorgente
+            oldest = src_mins.write_index - src_mins.available
+            new = min(new, mins.depth, (target * self.factor - oldest) // self.factor)
+            if new <= 0:
+                break
+            first = target - new
+            if first > mins.write_index:
+                mins.skip_to(first)
+                maxs.skip_to(first)
+
+            shape = (self.hub.channels, new, self.factor)
+            src_start = first * self.factor
+            n_src = new * self.factor
+            mins.write(src_mins.window(src_start, n_src).reshape(shape).min(axis=2).T)
+            maxs.write(src_maxs.window(src_start, n_src).reshape(shape).max(axis=2).T)
+            src_mins, src_maxs = mins, maxs
+
+    def read_latest(self, n_samples, max_points):
+        """Envelope of the newest n_samples for plotting.
+
+        Returns (offsets, values): offsets are sample positions relative to
+        the start of the requested window (float), values is a
+        (channels, len(offsets)) array. On a pyramid level each bucket
+        contributes its min and its max at the same offset, so spikes
+        survive the reduction.
+        """
+        hub = self.hub
+        n_samples = int(min(n_samples, hub.depth))
+        window_start = hub.write_index - n_samples
+        start = max(window_start, hub.write_index - hub.available)
+
+        bucket, mins, maxs = 1, hub, hub
+        for level_bucket, level_mins, level_maxs in self.levels:
+            if level_bucket * max_points > n_samples:
+                break
+            bucket, mins, maxs = level_bucket, level_mins, level_maxs
+
+        if bucket == 1:
+            n = hub.write_index - start
+            offsets = np.arange(start - window_start, n_samples, dtype=np.float64)
+            return offsets, hub.window(start, n)
+
+        # Bucket completi che cadono nella finestra
+        first = -(-start // bucket)
+        last = mins.write_index
+        first = max(first, last - mins.available)
+        count = last - first
+        if count <= 0:
+            return np.empty(0), np.empty((hub.channels, 0), dtype=hub.dtype)
+
+        values = np.empty((hub.channels, 2 * count), dtype=hub.dtype)
+        values[:, 0::2] = mins.window(first, count)
+        values[:, 1::2] = maxs.window(first, count)
+        centers = (np.arange(first, last, dtype=np.float64) + 0.5) * bucket - window_start
+        return np.repeat(centers, 2), values
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class PersistenceMap:
+    """Time x voltage hit counts of triggered sweeps (digital persistence).
+
+    Every point of every sweep falls in one (time, voltage) cell; a batch
+    of sweeps is folded in with a single np.bincount over all its points,
+    so thousands of sweeps per second cost a handful of NumPy calls. Old
+    hits fade exponentially with the acquisition time that has passed
+    (persistence_s is the time constant, np.inf keeps them forever).
+    """
+
+    def __init__(self, n_columns=500, n_rows=256, persistence_s=1.0):
+        self.hits = np.zeros((n_columns, n_rows), dtype=np.float32)
+        self.persistence_s = persistence_s
+        self.generation = 0
+        self.sweeps = 0
+        self.set_range(0.0, 1.0, -1.0, 1.0)
+
+    @property
+    def n_columns(self):
+        return self.hits.shape[0]
+
+    @property
+    def n_rows(self):
+        return self.hits.shape[1]
+
+    def set_range(self, t_min, t_max, v_min, v_max):
+        """Area covered by the map (s, V); the accumulated hits are cleared."""
+        if t_max <= t_min or v_max <= v_min:
+            raise ValueError("Persistence range must have positive width and height.")
+        self.t_min, self.t_max = float(t_min), float(t_max)
+        self.v_min, self.v_max = float(v_min), float(v_max)
+        self.clear()
+
+    def set_persistence(self, persistence_s):
+        self.persistence_s = persistence_s
+
+    def clear(self):
+        self.hits.fill(0)
+        self.sweeps = 0
+        self.generation += 1
+
+    def accumulate(self, x, y, elapsed_s=0.0):
+        """Fade by elapsed_s of acquisition time, then add sweeps y (k, n) at times x.
+
+        x is (n,) when all sweeps share the time axis, or (k, n) when each
+        sweep has its own (sub-sample trigger alignment). Points outside
+        the map are ignored.
+        """
+        if elapsed_s > 0 and np.isfinite(self.persistence_s):
+            self.hits *= np.float32(np.exp(-elapsed_s / self.persistence_s))
+        y = np.atleast_2d(y)
+        if y.size:
+            # Cella di ogni punto; floor e non troncamento, così -0.5 resta fuori
+            col = np.floor((np.broadcast_to(x, y.shape) - self.t_min)
+                           * (self.n_columns / (self.t_max - self.t_min)))
+            row = np.floor((y - self.v_min) * (self.n_rows / (self.v_max - self.v_min)))
+            inside = (col >= 0) & (col < self.n_columns) & (row >= 0) & (row < self.n_rows)
+            cells = col[inside].astype(np.intp) * self.n_rows + row[inside].astype(np.intp)
+            counts = np.bincount(cells, minlength=self.hits.size)
+            self.hits += counts.reshape(self.hits.shape)
+            self.sweeps += y.shape[0]
+        self.generation += 1
+
+    def image(self):
+        """Hits compressed with log1p, ready for an ImageItem (axis 0 = time)."""
+        return np.log1p(self.hits)
+
+
+def sweep_traces(hub, channel, trigger_indices, offsets, pre_trigger_samples, n, x_axis):
+    """Samples (k, n) of the sweeps still in the hub and their trigger-aligned times (k, n).
+
+    x_axis is the (n,) time axis of a sweep; each sweep's copy is shifted
+    by its sub-sample trigger offset. Sweeps that are no longer (or not
+    yet entirely) in the hub are skipped.
+    """
+    starts = trigger_indices - pre_trigger_samples
+    keep = (starts >= max(0, hub.write_index - hub.depth)) & (starts + n <= hub.write_index)
+    starts, offsets = starts[keep], offsets[keep]
+    y = hub.gather(starts, n, channel)
+    step = x_axis[1] - x_axis[0] if n > 1 else 0.0
+    x = x_axis[None, :] - offsets[:, None] * step
+    return x, y
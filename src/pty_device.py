@@ -0,0 +1,148 @@
+"""Pseudo-terminal stand-in for the TrueSignal USB hardware (POSIX only).
+
+Streams synthetic frames in the device's binary format on a pty, so the
+serial backend can be exercised without hardware:
+
+    python -m src.pty_device --rate 1000000
+    python main.py --source serial --port /dev/pts/N --rate 1000000
+"""
+import argparse
+import os
+import threading
+import time
+import tty
+
+import numpy as np
+from src.signal_generator import SimulatedSignalGenerator
+from src.truesignal_protocol import encode_frames, DEFAULT_SAMPLES_PER_FRAME
+
+TRUNCATED_BYTES = 5  # Byte tolti dal centro di un frame troncato
+
+
+class PtyDeviceEmulator:
+    """Writes simulated frames on the master side of a pty from a background thread.
+
+    sampling_rate_hz=None streams as fast as the reader drains the pty.
+    drop_probability, corrupt_probability and truncate_probability inject
+    missing frames, bad CRCs and frames that lose bytes in the middle, to
+    check the error counters and the resynchronisation of the driver.
+    """
+
+    def __init__(self, sampling_rate_hz=None, samples_per_frame=DEFAULT_SAMPLES_PER_FRAME,
+                 frames_per_write=16, volts_per_count=10.0 / 32768, seed=None,
+                 drop_probability=0.0, corrupt_probability=0.0, truncate_probability=0.0):
+        self.sampling_rate_hz = sampling_rate_hz
+        self.samples_per_frame = samples_per_frame
+        self.frames_per_write = frames_per_write
+        self.volts_per_count = volts_per_count
+        self.drop_probability = drop_probability
+        self.corrupt_probability = corrupt_probability
+        self.truncate_probability = truncate_probability
+        self.generator = SimulatedSignalGenerator(seed=seed)
+        self.rng = np.random.default_rng(seed)
+
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.frames_corrupted = 0
+        self.frames_truncated = 0
+        self._seq = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="PtyDeviceEmulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _next_chunk(self):
+        n = self.frames_per_write
+        volts = self.generator.generate(n * self.samples_per_frame)
+        counts = np.clip(np.round(volts / self.volts_per_count), -32768, 32767).astype('<i2')
+        data = np.frombuffer(
+            encode_frames(counts.reshape(n, self.samples_per_frame, -1), self._seq),
+            dtype=np.uint8).copy()
+        self._seq = (self._seq + n) & 0xFFFF
+
+        frame_size = data.size // n
+        frames = data.reshape(n, frame_size)
+        keep = np.ones(n, dtype=bool)
+        if self.drop_probability > 0:
+            keep &= self.rng.random(n) >= self.drop_probability
+        intact = keep.copy()
+        if self.corrupt_probability > 0:
+            corrupt = np.flatnonzero(self.rng.random(n) < self.corrupt_probability)
+            frames[corrupt, frame_size // 2] ^= 0xFF
+            self.frames_corrupted += corrupt.size
+            intact[corrupt] = False
+        sent = np.repeat(keep[:, None], frame_size, axis=1)
+        if self.truncate_probability > 0:
+            truncated = np.flatnonzero(intact & (self.rng.random(n) < self.truncate_probability))
+            sent[truncated, frame_size // 2:frame_size // 2 + TRUNCATED_BYTES] = False
+            self.frames_truncated += truncated.size
+        self.frames_dropped += int(n - np.count_nonzero(keep))
+        self.frames_sent += int(np.count_nonzero(keep))
+        return frames[sent].tobytes()
+
+    def _run(self):
+        t0 = time.perf_counter()
+        samples_written = 0
+        while not self._stop_event.is_set():
+            if self.sampling_rate_hz:
+                ahead = samples_written / self.sampling_rate_hz - (time.perf_counter() - t0)
+                if ahead > 0:
+                    self._stop_event.wait(ahead)
+                    continue
+            chunk = memoryview(self._next_chunk())
+            samples_written += self.frames_per_write * self.samples_per_frame
+            while chunk and not self._stop_event.is_set():
+                try:
+                    written = os.write(self.master_fd, chunk)
+                except OSError:
+                    return
+                chunk = chunk[written:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate a TrueSignal device on a pseudo-terminal")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Samples per second per channel (default: as fast as possible)")
+    parser.add_argument("--drop", type=float, default=0.0, help="Probability of dropping a frame")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Probability of corrupting a frame")
+    parser.add_argument("--truncate", type=float, default=0.0,
+                        help="Probability of cutting bytes out of a frame")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    device = PtyDeviceEmulator(args.rate, seed=args.seed,
+                               drop_probability=args.drop, corrupt_probability=args.corrupt,
+                               truncate_probability=args.truncate)
+    device.start()
+    print(f"TrueSignal emulator streaming on {device.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.stop()
+        print(f"Frames sent: {device.frames_sent}, dropped: {device.frames_dropped}, "
+              f"corrupted: {device.frames_corrupted}, truncated: {device.frames_truncated}")
+
+
+if __name__ == "__main__":
+    main()
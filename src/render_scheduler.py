@@ -0,0 +1,61 @@
+import time
+
+from PySide6.QtCore import QObject, QTimer, Qt, Slot
+
+
+class RenderScheduler(QObject):
+    """One display clock for every plot widget.
+
+    Each tick redraws, in a single pass, only the registered widgets that
+    are currently visible (widgets on hidden tabs cost nothing). Anything
+    that wants a redraw outside the regular tick calls request_frame():
+    several requests in the same event-loop iteration collapse into one
+    extra frame.
+    """
+
+    def __init__(self, fps=30.0, parent=None):
+        super().__init__(parent)
+        self.widgets = []
+        self.frames_rendered = 0
+        self.last_frame_s = 0.0
+        self._frame_pending = False
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.render_frame)
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        if fps <= 0:
+            raise ValueError("Display rate must be positive.")
+        self.fps = float(fps)
+        self.timer.setInterval(max(1, int(round(1000.0 / self.fps))))
+
+    def register(self, widget):
+        if widget not in self.widgets:
+            self.widgets.append(widget)
+
+    def unregister(self, widget):
+        if widget in self.widgets:
+            self.widgets.remove(widget)
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def request_frame(self):
+        """Redraw the visible widgets as soon as the event loop is free."""
+        if not self._frame_pending:
+            self._frame_pending = True
+            QTimer.singleShot(0, self.render_frame)
+
+    @Slot()
+    def render_frame(self):
+        self._frame_pending = False
+        t0 = time.perf_counter()
+        for widget in self.widgets:
+            if widget.isVisible():
+                widget.update_display()
+        self.last_frame_s = time.perf_counter() - t0
+        self.frames_rendered += 1
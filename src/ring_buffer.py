@@ -0,0 +1,34 @@
+def write_block_to_ring(buffer, ptr, block):
+    """Copy a 1-D block into a circular buffer starting at ptr and return the new ptr.
+
+    At most two slice assignments are performed, whatever the block length.
+    """
+    size = buffer.shape[0]
+    n = block.shape[0]
+    if n == 0:
+        return ptr
+    if n >= size:
+        # Il blocco riempie tutto il buffer: teniamo solo gli ultimi `size` campioni
+        buffer[:] = block[-size:]
+        return 0
+
+    end = ptr + n
+    if end <= size:
+        buffer[ptr:end] = block
+    else:
+        first = size - ptr
+        buffer[ptr:] = block[:first]
+        buffer[:end - size] = block[first:]
+    return end % size
+
+
+def ordered_copy(buffer, ptr, out):
+    """Copy a circular buffer written up to ptr into out, oldest sample first, and return out.
+
+    Works along the last axis, so an (channels, size) array of rings
+    sharing one ptr is reordered in the same two slice assignments.
+    """
+    first = buffer.shape[-1] - ptr
+    out[..., :first] = buffer[..., ptr:]
+    out[..., first:] = buffer[..., :ptr]
+    return out
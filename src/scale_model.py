@@ -0,0 +1,62 @@
+import numpy as np
+
+VOLT_UNITS = {"V": 1.0, "mV": 1e-3, "uV": 1e-6}
+TIME_UNITS = {"s": 1.0, "ms": 1e-3, "us": 1e-6}
+DIVISIONS = 10
+
+
+class ScaleModel:
+    """Volt/Div and Time/Div resolved once, when the controls change.
+
+    Widgets read plain floats from here instead of querying the spinboxes
+    and parsing the unit text every frame. generation is bumped on every
+    change, and x-axis arrays are cached per number of points until the
+    time scale changes.
+    """
+
+    def __init__(self, volts_per_div=1.0, volt_unit="V", time_per_div=1.0, time_unit="s"):
+        self.generation = 0
+        self._x_axes = {}
+        self.set_voltage(volts_per_div, volt_unit)
+        self.set_time(time_per_div, time_unit)
+
+    def set_voltage(self, value, unit):
+        """value is the spinbox number, unit one of VOLT_UNITS."""
+        self.volt_div_value = float(value)
+        self.volt_unit = unit if unit in VOLT_UNITS else "V"
+        self.volt_multiplier = VOLT_UNITS[self.volt_unit]
+        self.volts_per_div = self.volt_div_value * self.volt_multiplier
+        self.total_volts = self.volts_per_div * DIVISIONS
+        self.generation += 1
+
+    def set_time(self, value, unit):
+        """value is the spinbox number, unit one of TIME_UNITS."""
+        self.time_div_value = float(value)
+        self.time_unit = unit if unit in TIME_UNITS else "s"
+        self.seconds_per_div = self.time_div_value * TIME_UNITS[self.time_unit]
+        self.total_time = self.seconds_per_div * DIVISIONS
+        self._x_axes.clear()
+        self.generation += 1
+
+    def x_axis(self, n_points):
+        """Read-only np.linspace(0, total_time, n_points), built once per time scale."""
+        axis = self._x_axes.get(n_points)
+        if axis is None:
+            axis = np.linspace(0, self.total_time, n_points)
+            axis.flags.writeable = False
+            self._x_axes[n_points] = axis
+        return axis
+
+    def autorange_volts(self, signal_range):
+        """Vertical span (V) that fits a captured frame, or None if Volt/Div already fits it.
+
+        Same thresholds as the original spinbox autorange: shrink the
+        signal to 8 divisions when it fills more than 80% of the screen,
+        grow it to 4 divisions when it fills less than 20%.
+        """
+        signal_range = float(signal_range)  # np.float32 dal DataHub non va passato a pyqtgraph
+        if signal_range > self.total_volts * 0.8:
+            return signal_range / 8 * DIVISIONS
+        if 0 < signal_range < self.total_volts * 0.2:
+            return signal_range / 4 * DIVISIONS
+        return None
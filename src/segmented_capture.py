@@ -0,0 +1,142 @@
+import time
+
+import numpy as np
+from PySide6.QtCore import QObject, Signal, Slot
+
+
+class SegmentedCapture(QObject):
+    """Segmented memory: many triggered segments captured back-to-back.
+
+    Each armed capture fills a preallocated (n_segments, segment_len) array
+    straight from the DataHub, one fancy-indexing copy per incoming block,
+    with no redraw in between. Triggers come from the handler's
+    scan_block(), so level, hysteresis and holdoff are the same as in the
+    sweep display. The handler re-arms as soon as the post-trigger part of
+    a segment has been acquired (or after the holdoff, if longer).
+    """
+    capture_finished = Signal()
+
+    def __init__(self, hub, handler, sampling_rate_hz, parent=None):
+        super().__init__(parent)
+        self.hub = hub
+        self.handler = handler
+        self.sampling_rate_hz = sampling_rate_hz
+        self.channel = 1
+        self.pre_trigger_samples = 0
+        self.post_trigger_samples = 1
+        self.segments = np.empty((0, 1), dtype=hub.dtype)
+        self.trigger_indices = np.empty(0, dtype=np.int64)
+        self.trigger_offsets = np.empty(0, dtype=np.float64)
+        self.count = 0
+        self.armed = False
+        self.generation = 0
+        self.processing_s = 0.0
+        self._pending = np.empty(0, dtype=np.int64)
+        self._pending_offsets = np.empty(0, dtype=np.float64)
+        self._started_s = 0.0
+        self._finished_s = 0.0
+
+    @property
+    def n_segments(self):
+        return self.segments.shape[0]
+
+    @property
+    def segment_len(self):
+        return self.segments.shape[1]
+
+    def arm(self, n_segments, segment_len, channel=None):
+        """Start a new capture of n_segments segments, trigger in the middle of each."""
+        if n_segments <= 0:
+            raise ValueError("Number of segments must be positive.")
+        if not 2 <= segment_len <= self.hub.depth:
+            raise ValueError(f"Segment length must be between 2 and the hub depth ({self.hub.depth}).")
+        if channel is not None:
+            self.channel = channel
+        # Gli array vengono riallocati solo se cambia la forma della cattura
+        if self.segments.shape != (n_segments, segment_len):
+            self.segments = np.empty((n_segments, segment_len), dtype=self.hub.dtype)
+            self.trigger_indices = np.empty(n_segments, dtype=np.int64)
+            self.trigger_offsets = np.empty(n_segments, dtype=np.float64)
+        self.pre_trigger_samples = segment_len // 2
+        self.post_trigger_samples = segment_len - self.pre_trigger_samples
+        self.handler.set_frame(self.pre_trigger_samples, self.post_trigger_samples)
+        self.handler.unfreeze()
+        self.handler.last_trigger_index = None
+        self.count = 0
+        self.processing_s = 0.0
+        self._pending = self._pending[:0]
+        self._pending_offsets = self._pending_offsets[:0]
+        self._started_s = time.perf_counter()
+        self.armed = True
+        self.generation += 1
+
+    def abort(self):
+        self.armed = False
+
+    @Slot(np.ndarray)
+    def on_new_block(self, block):
+        # Il blocco è già nell'hub (SignalSource scrive prima di emettere block_updated)
+        if self.armed:
+            self.process_block(block[:, self.channel], self.hub.write_index - block.shape[0])
+
+    def process_block(self, samples, start_index):
+        """Scan one block of the capture channel and store the segments it completes."""
+        t0 = time.perf_counter()
+        triggers, offsets = self.handler.scan_block(samples, start_index)
+        if self._pending.size:
+            triggers = np.concatenate((self._pending, triggers))
+            offsets = np.concatenate((self._pending_offsets, offsets))
+
+        # Un segmento è completo quando la parte dopo il trigger è nell'hub;
+        # quelli con la parte prima già sovrascritta (o mai scritta) vengono scartati
+        end_index = start_index + samples.shape[0]
+        n_complete = int(np.count_nonzero(triggers + self.post_trigger_samples <= end_index))
+        self._pending, self._pending_offsets = triggers[n_complete:], offsets[n_complete:]
+        starts = triggers[:n_complete] - self.pre_trigger_samples
+        keep = starts >= max(0, self.hub.write_index - self.hub.depth)
+        starts, offsets = starts[keep], offsets[:n_complete][keep]
+
+        n_new = min(starts.size, self.n_segments - self.count)
+        if n_new:
+            rows = slice(self.count, self.count + n_new)
+            self.hub.gather(starts[:n_new], self.segment_len, self.channel, out=self.segments[rows])
+            self.trigger_indices[rows] = starts[:n_new] + self.pre_trigger_samples
+            self.trigger_offsets[rows] = offsets[:n_new]
+            self.count += n_new
+        self.processing_s += time.perf_counter() - t0
+
+        if self.count == self.n_segments:
+            self.armed = False
+            self._finished_s = time.perf_counter()
+            self.generation += 1
+            self.capture_finished.emit()
+
+    def segment_x_axis(self):
+        """Time of each sample relative to its segment's trigger point, (count, segment_len) in s.
+
+        The sub-sample trigger offset is applied per segment, so overlaid
+        segments line up on the interpolated crossing.
+        """
+        ticks = np.arange(self.segment_len, dtype=np.float64) - self.pre_trigger_samples
+        return (ticks - self.trigger_offsets[:self.count, None]) / self.sampling_rate_hz
+
+    def stats(self):
+        """Segments captured and the shortest re-arm dead time between two of them.
+
+        Dead time is the gap between the end of a segment and the trigger
+        of the next one: 0 means the next trigger was accepted on the very
+        first sample after the segment.
+        """
+        captured = self.trigger_indices[:self.count]
+        intervals = np.diff(captured)
+        min_dead_time = int(intervals.min()) - self.post_trigger_samples if intervals.size else None
+        elapsed = (self._finished_s if not self.armed else time.perf_counter()) - self._started_s
+        return {
+            'segments': self.count,
+            'min_interval_samples': int(intervals.min()) if intervals.size else None,
+            'min_dead_time_samples': min_dead_time,
+            'min_dead_time_s': None if min_dead_time is None else min_dead_time / self.sampling_rate_hz,
+            'span_s': (int(captured[-1] - captured[0]) / self.sampling_rate_hz) if self.count > 1 else 0.0,
+            'elapsed_s': elapsed,
+            'processing_s': self.processing_s,
+        }
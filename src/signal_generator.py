@@ -0,0 +1,153 @@
+import numpy as np
+
+
+class SimulatedSignalGenerator:
+    """Vectorized generator for the two simulated channels.
+
+    Every call to generate() produces a whole (N, 2) block with a handful of
+    NumPy calls instead of drawing scalars per sample. All randomness comes
+    from a single np.random.Generator, so the same seed and the same sequence
+    of block sizes always give the same data.
+    """
+
+    CHANNELS = 2
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        # Signal 1 parameters (Smooth Random Walk)
+        self.signal1_params = {
+            'step_size': 0.1,        # Size of random steps (σ of normal distribution)
+            'noise_level': 0.05,     # Additional noise level
+            'max_amplitude': 5.0,     # Maximum absolute amplitude
+            'baseline_drift': 0.01    # Slow drift in the baseline
+        }
+
+        # Signal 2 parameters (Chaotic with Spikes)
+        self.signal2_params = {
+            'step_size': 0.2,        # Size of random steps
+            'noise_level': 0.1,      # Additional noise level
+            'max_amplitude': 3.0,     # Maximum amplitude (excluding spikes)
+            'spike_probability': 0.02,# Probability of spikes (2%)
+            'spike_amplitude': 4.0,   # Amplitude of spikes
+            'spike_noise': 0.5,      # Noise added to spikes
+            'burst_mode': False,     # Whether to generate burst of spikes
+            'burst_duration': 50,     # Duration of burst in samples
+            'burst_interval': 500     # Minimum samples between bursts
+        }
+
+        # Stato che collega un blocco al successivo
+        self.last_value1 = 0.0
+        self.last_value2 = 0.0
+        self.baseline_drift = 0.0
+        self.burst_counter = 0
+        self.samples_since_last_burst = 0
+
+    def reset(self, seed=None):
+        """Restart the generator state, optionally with a new seed."""
+        if seed is not None:
+            self.seed = seed
+        self.rng = np.random.default_rng(self.seed)
+        self.last_value1 = 0.0
+        self.last_value2 = 0.0
+        self.baseline_drift = 0.0
+        self.burst_counter = 0
+        self.samples_since_last_burst = 0
+
+    def generate(self, n_samples, out=None):
+        """Return an (n_samples, 2) float64 block for channel 1 and channel 2."""
+        if out is None:
+            out = np.empty((n_samples, self.CHANNELS), dtype=np.float64)
+        if n_samples <= 0:
+            return out
+        out[:, 0] = self._generate_signal1(n_samples)
+        out[:, 1] = self._generate_signal2(n_samples)
+        return out
+
+    def _clipped_walk(self, start, steps, limit):
+        # Random walk come somma cumulativa; il clipping è applicato al risultato,
+        # quindi la saturazione è approssimata ma limitata al singolo blocco.
+        walk = np.cumsum(steps)
+        walk += start
+        np.clip(walk, -limit, limit, out=walk)
+        return walk
+
+    def _generate_signal1(self, n):
+        p = self.signal1_params
+        rng = self.rng
+
+        drift = self._clipped_walk(
+            self.baseline_drift, rng.normal(0, p['baseline_drift'], n), 1.0)
+        walk = self._clipped_walk(
+            self.last_value1, rng.normal(0, p['step_size'], n), p['max_amplitude'])
+        self.baseline_drift = float(drift[-1])
+        self.last_value1 = float(walk[-1])
+
+        values = walk + drift
+        values += rng.normal(0, p['noise_level'], n)
+        return values
+
+    def _generate_signal2(self, n):
+        p = self.signal2_params
+        rng = self.rng
+
+        if p['burst_mode']:
+            spike_mask = self._burst_mask(n)
+        else:
+            spike_mask = rng.random(n) < p['spike_probability']
+
+        # Il random walk avanza solo sui campioni che non sono spike
+        steps = rng.normal(0, p['step_size'], n)
+        steps[spike_mask] = 0.0
+        walk = self._clipped_walk(self.last_value2, steps, p['max_amplitude'])
+        self.last_value2 = float(walk[-1])
+
+        values = walk + rng.normal(0, p['noise_level'], n)
+
+        n_spikes = int(np.count_nonzero(spike_mask))
+        if n_spikes:
+            signs = rng.integers(0, 2, n_spikes) * 2 - 1
+            values[spike_mask] = (signs * p['spike_amplitude'] +
+                                  rng.normal(0, p['spike_noise'], n_spikes))
+        return values
+
+    def _burst_mask(self, n):
+        """Mask of the samples of this block that belong to a burst.
+
+        A burst can start only after burst_interval quiet samples and then lasts
+        burst_duration samples after the starting one. The loop runs once per
+        burst, never per sample.
+        """
+        p = self.signal2_params
+        duration = int(p['burst_duration'])
+        interval = int(p['burst_interval'])
+        mask = np.zeros(n, dtype=bool)
+        candidates = np.flatnonzero(self.rng.random(n) < p['spike_probability'])
+
+        i = 0
+        if self.burst_counter > 0:
+            # Completa il burst iniziato nel blocco precedente
+            k = min(self.burst_counter, n)
+            mask[:k] = True
+            self.burst_counter -= k
+            self.samples_since_last_burst = 0
+            i = k
+            if self.burst_counter > 0:
+                return mask
+
+        while i < n:
+            earliest = i + max(0, interval - self.samples_since_last_burst - 1)
+            pos = np.searchsorted(candidates, earliest)
+            if pos >= candidates.size:
+                self.samples_since_last_burst += n - i
+                break
+            start = int(candidates[pos])
+            end = start + 1 + duration
+            mask[start:min(end, n)] = True
+            self.samples_since_last_burst = 0
+            if end > n:
+                self.burst_counter = end - n
+                break
+            i = end
+        return mask
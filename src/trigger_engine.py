@@ -0,0 +1,202 @@
+import numpy as np
+
+# Rilevamento vettoriale dei trigger su un intero blocco di campioni.
+# Ogni funzione riceve il blocco nuovo e l'ultimo campione del blocco
+# precedente (previous, None se non c'è) e restituisce gli indici nel
+# blocco del campione che completa l'evento, in ordine crescente.
+
+
+def _with_previous(samples, previous):
+    # Restituisce la sequenza da confrontare e lo scostamento tra indici di diff e del blocco
+    if previous is None:
+        return samples, 1
+    x = np.empty(samples.shape[0] + 1, dtype=samples.dtype)
+    x[0] = previous
+    x[1:] = samples
+    return x, 0
+
+
+def rising_edges(samples, level=0.0, previous=None):
+    """Indices i where the signal goes from below level to >= level."""
+    x, offset = _with_previous(samples, previous)
+    above = x >= level
+    return np.flatnonzero(np.diff(above.view(np.int8)) == 1) + offset
+
+
+def falling_edges(samples, level=0.0, previous=None):
+    """Indices i where the signal goes from above level to <= level."""
+    x, offset = _with_previous(samples, previous)
+    below = x <= level
+    return np.flatnonzero(np.diff(below.view(np.int8)) == 1) + offset
+
+
+def slope_events(samples, threshold, previous=None):
+    """Indices i where |samples[i] - samples[i-1]| exceeds threshold."""
+    x, offset = _with_previous(samples, previous)
+    return np.flatnonzero(np.abs(np.diff(x)) > threshold) + offset
+
+
+def hysteresis_edges(samples, level=0.0, hysteresis=0.0, rising=True, state=0):
+    """Edges through level that first went past the hysteresis band.
+
+    A rising edge is only counted once the signal has been below
+    level - hysteresis (falling: above level + hysteresis), so noise around
+    the level cannot retrigger. state is the last armed/fired state from
+    the previous block (-1 armed, +1 fired, 0 unknown). Returns
+    (indices, state).
+    """
+    if not rising:
+        samples = -samples
+        level = -level
+    # +1 oltre il livello, -1 sotto la banda di isteresi, 0 dentro la banda
+    cls = (samples >= level).view(np.int8) - (samples < level - hysteresis).view(np.int8)
+    decided = np.flatnonzero(cls)
+    if decided.size == 0:
+        return decided, state
+    seq = cls[decided]
+    prev = np.empty_like(seq)
+    prev[0] = state
+    prev[1:] = seq[:-1]
+    return decided[(prev == -1) & (seq == 1)], int(seq[-1])
+
+
+def crossing_offsets(samples, indices, level=0.0, previous=None):
+    """Sub-sample position of the level crossing that completes each edge.
+
+    The crossing is linearly interpolated between samples[i - 1] (previous
+    for i == 0) and samples[i]; it lies at indices + offsets, with offsets
+    in (-1, 0]. Works for rising and falling edges alike.
+    """
+    current = samples[indices]
+    before = np.empty_like(current)
+    inside = indices > 0
+    before[inside] = samples[indices[inside] - 1]
+    before[~inside] = current[~inside] if previous is None else previous
+    step = current - before
+    offsets = np.zeros(current.shape, dtype=np.float64)
+    np.divide(level - current, step, out=offsets, where=step != 0)
+    return np.clip(offsets, -1.0, 0.0)
+
+
+def apply_holdoff(indices, holdoff, last_index=None):
+    """Drop events closer than holdoff samples to the previously accepted one.
+
+    indices must be sorted. last_index is the last accepted event before
+    this batch (None if there is none). Only accepted events cost a
+    searchsorted, so the loop is short even on long blocks.
+    """
+    if holdoff <= 0 or indices.size == 0:
+        return indices
+    if ((last_index is None or indices[0] >= last_index + holdoff)
+            and np.all(np.diff(indices) >= holdoff)):
+        return indices  # Nessun evento da scartare: niente ciclo
+    accepted = []
+    pos = 0 if last_index is None else int(np.searchsorted(indices, last_index + holdoff))
+    while pos < indices.size:
+        event = indices[pos]
+        accepted.append(event)
+        pos = int(np.searchsorted(indices, event + holdoff, side='left'))
+    return np.asarray(accepted, dtype=indices.dtype)
+
+
+# Trigger avanzati: il blocco viene classificato rispetto alle soglie e
+# codificato a run (run-length encoding); gli eventi sono sequenze di run.
+# Qui gli indici sono assoluti (start_index = indice del primo campione del
+# blocco) perché un run può iniziare molti blocchi prima di finire.
+
+
+def level_runs(classes, start_index, state=None):
+    """Run-length encoding of a block of sample classes, continuing from state.
+
+    classes is a 1-D bool or int8 array. Returns (values, starts, state):
+    one entry per run, in order, with absolute start indices; the last run
+    is still open. Runs whose end is before start_index were already
+    reported by the previous block. A start of -1 means the run began
+    before the first scanned block (its length is unknown).
+    """
+    change = np.flatnonzero(classes[1:] != classes[:-1]) + 1
+    starts = np.empty(change.size + 1, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = change
+    values = classes[starts]
+    starts += start_index
+    if state is None:
+        starts[0] = -1
+    else:
+        # Gli ultimi due run del blocco precedente: l'ultimo prosegue se ha la stessa classe
+        prev_values, prev_starts = state
+        if prev_values[-1] == values[0]:
+            starts[0] = prev_starts[-1]
+            prev_values, prev_starts = prev_values[:-1], prev_starts[:-1]
+        values = np.concatenate((prev_values, values))
+        starts = np.concatenate((prev_starts, starts))
+    return values, starts, (values[-2:], starts[-2:])
+
+
+def _band_classes(samples, low, high, positive):
+    # -1 sotto low, +1 da high in su, 0 nella banda; invertite per la polarità negativa
+    cls = (samples >= high).view(np.int8) - (samples < low).view(np.int8)
+    return cls if positive else -cls
+
+
+def pulse_width_events(samples, start_index, level, width, longer=False, positive=True, state=None):
+    """End of every pulse narrower (longer=False) or wider (longer=True) than width samples.
+
+    A positive pulse is a run of samples >= level, a negative one a run of
+    samples < level. The event is the first sample after the pulse.
+    Returns (absolute indices, state).
+    """
+    inside = samples >= level if positive else samples < level
+    values, starts, state = level_runs(inside, start_index, state)
+    ends = starts[1:]
+    widths = ends - starts[:-1]
+    fits = widths > width if longer else widths < width
+    hit = values[:-1] & (starts[:-1] >= 0) & (ends >= start_index) & fits
+    return ends[hit], state
+
+
+def runt_events(samples, start_index, low, high, positive=True, state=None):
+    """Pulses that cross low but fall back without reaching high (runts).
+
+    A positive runt goes from below low into the band and back below low;
+    a negative runt from above high into the band and back above high.
+    The event is the first sample back outside the band. Returns
+    (absolute indices, state).
+    """
+    values, starts, state = level_runs(_band_classes(samples, low, high, positive), start_index, state)
+    ends = starts[2:]
+    hit = ((values[1:-1] == 0) & (values[:-2] == -1) & (values[2:] == -1)
+           & (ends >= start_index))
+    return ends[hit], state
+
+
+def window_events(samples, low, high, entering=True, previous=None):
+    """Indices i where the signal enters (or leaves) the band [low, high]."""
+    x, offset = _with_previous(samples, previous)
+    inside = (x >= low) & (x <= high)
+    step = np.diff(inside.view(np.int8))
+    return np.flatnonzero(step == (1 if entering else -1)) + offset
+
+
+def slew_rate_events(samples, start_index, low, high, duration, slower=False, positive=True, state=None):
+    """Edges from low to high (falling: high to low) faster or slower than duration samples.
+
+    The transition time is the number of samples spent inside the band
+    between the last sample beyond one threshold and the first beyond the
+    other; the event is that first sample past the far threshold.
+    Returns (absolute indices, state).
+    """
+    values, starts, state = level_runs(_band_classes(samples, low, high, positive), start_index, state)
+    # Passaggio con campioni nella banda (-1, 0, +1) o diretto (-1, +1)
+    through = (values[:-2] == -1) & (values[1:-1] == 0) & (values[2:] == 1)
+    through_time = starts[2:] - starts[1:-1]
+    direct = (values[:-1] == -1) & (values[1:] == 1)
+    indices = np.concatenate((starts[2:][through], starts[1:][direct]))
+    times = np.concatenate((through_time[through], np.zeros(np.count_nonzero(direct), dtype=np.int64)))
+    fits = times > duration if slower else times < duration
+    keep = fits & (indices >= start_index)
+    if through.any():
+        # Il primo run della banda deve essere noto per misurarne la durata
+        keep &= np.concatenate((starts[1:-1][through] >= 0,
+                                np.ones(np.count_nonzero(direct), dtype=bool)))
+    return np.sort(indices[keep]), state
@@ -1,9 +1,32 @@
 import numpy as np
 from PySide6.QtCore import QObject, Signal, Slot
+from src.trigger_engine import (hysteresis_edges, slope_events, apply_holdoff, crossing_offsets,
+                                pulse_width_events, runt_events, window_events, slew_rate_events)
+
+SWEEP_MODES = ("Auto", "Normal", "Single", "Stop")
+# Tipi di trigger; la polarità (salita/discesa, impulso positivo/negativo)
+# viene dalle caselle Positive/Negative edge
+TRIGGER_TYPES = ("Edge", "Pulse <", "Pulse >", "Runt", "Window in", "Window out", "Slew <", "Slew >")
+# Sorgenti del trigger: un canale dell'hub o la differenza dei due (math)
+TRIGGER_SOURCES = ("CH1", "CH2", "CH1-CH2")
+
+
+def source_samples(block, source):
+    """1-D samples of trigger source `source` in an (N, channels) block."""
+    if source == "CH1":
+        return block[:, 0]
+    if source == "CH2":
+        return block[:, 1]
+    if source == "CH1-CH2":
+        return block[:, 0] - block[:, 1]
+    raise ValueError(f"Unknown trigger source: {source}. Choose from {TRIGGER_SOURCES}.")
+
 
 class TriggerHandler(QObject):
     trigger_detected = Signal(int)  # Emits buffer index where trigger occurred
 
+    MAX_COLLECTED_BLOCKS = 256  # Blocchi di sweep conservati per collected_since()
+
     def __init__(self, buffer_size):
         super().__init__()
         self.buffer_size = buffer_size
@@ -15,9 +38,44 @@ class TriggerHandler(QObject):
         self.frozen_data = None
         self.frozen_index = None
         self.last_value = None
+        self.trigger_level = 0.0  # Livello dei trigger sul fronte (V)
+        self.hysteresis = 0.0  # Banda che il segnale deve attraversare prima di un nuovo fronte (V)
+        self.holdoff_samples = 0  # Campioni minimi tra due trigger
+        self.last_trigger_index = None
+        # Macchina a stati degli sweep (vedi process_block)
+        self.sweep_mode = "Auto"
+        self.pre_trigger_samples = buffer_size // 2
+        self.post_trigger_samples = buffer_size - self.pre_trigger_samples
+        self.auto_timeout_samples = buffer_size
+        self.pending_trigger = None
+        self.pending_offset = 0.0
+        self.sweep_index = None
+        # Posizione frazionaria del punto di trigger rispetto a sweep_index, in (-1, 0]
+        self.sweep_offset = 0.0
+        self.sweep_triggered = False
+        self.sweep_generation = 0
+        self._taken_generation = 0
+        # Sweep precedenti all'ultimo rearm() non vengono più consegnati
+        self._armed_generation = 0
+        self._shown_generation = 0
+        self._last_sweep_end = 0
+        self.sweeps_captured = 0
+        self.sweeps_displayed = 0
+        self.auto_sweeps = 0
+        # Tipi avanzati: seconda soglia e durata (larghezza impulso / tempo di salita)
+        self.trigger_type = "Edge"
+        self.upper_level = 1.0  # V; la banda è tra trigger_level e upper_level
+        self.width_samples = 10
+        self._edge_state = 0
+        self._run_state = None
+        # Con collect_sweeps (persistenza) vengono conservati tutti gli sweep, non solo l'ultimo,
+        # in blocchi (sweep_generation, indici, offset) letti da ogni grafico con collected_since()
+        self.collect_sweeps = False
+        self._collected = []
         
     def set_pos_edge_enabled(self, enabled):
         self.pos_edge_enabled = enabled
+        self._reset_scan_state()
         if enabled:
             self.neg_edge_enabled = False
             self.derivative_enabled = False
@@ -26,6 +84,7 @@ class TriggerHandler(QObject):
             
     def set_neg_edge_enabled(self, enabled):
         self.neg_edge_enabled = enabled
+        self._reset_scan_state()
         if enabled:
             self.pos_edge_enabled = False
             self.derivative_enabled = False
@@ -39,6 +98,37 @@ class TriggerHandler(QObject):
             self.pos_edge_enabled = False
             self.neg_edge_enabled = False
 
+    def set_level(self, level):
+        self.trigger_level = float(level)
+        self._reset_scan_state()
+
+    def set_hysteresis(self, hysteresis):
+        self.hysteresis = max(0.0, float(hysteresis))
+        self._reset_scan_state()
+
+    def set_holdoff(self, holdoff_samples):
+        self.holdoff_samples = max(0, int(holdoff_samples))
+
+    def set_trigger_type(self, trigger_type):
+        if trigger_type not in TRIGGER_TYPES:
+            raise ValueError(f"Unknown trigger type: {trigger_type}. Choose from {TRIGGER_TYPES}.")
+        self.trigger_type = trigger_type
+        self._reset_scan_state()
+
+    def set_upper_level(self, level):
+        self.upper_level = float(level)
+        self._reset_scan_state()
+
+    def set_width(self, width_samples):
+        """Pulse width (Pulse) or transition time (Slew) limit, in samples."""
+        self.width_samples = max(1, int(width_samples))
+        self._reset_scan_state()
+
+    def _reset_scan_state(self):
+        # Lo stato tra un blocco e l'altro non vale più con le nuove impostazioni
+        self._edge_state = 0
+        self._run_state = None
+
     def check_trigger(self, buffer):
         if self.is_frozen:
             return None
@@ -66,20 +156,219 @@ class TriggerHandler(QObject):
                 return current_idx
 
         # Check positive edge trigger
-        if self.pos_edge_enabled and prev_val < 0 and current_val >= 0:
+        if self.pos_edge_enabled and prev_val < self.trigger_level and current_val >= self.trigger_level:
             self.is_frozen = True
             self.frozen_index = current_idx
             return current_idx
 
         # Check negative edge trigger
-        if self.neg_edge_enabled and prev_val > 0 and current_val <= 0:
+        if self.neg_edge_enabled and prev_val > self.trigger_level and current_val <= self.trigger_level:
             self.is_frozen = True
             self.frozen_index = current_idx
             return current_idx
 
         return None
 
+    def set_sweep_mode(self, mode):
+        if mode not in SWEEP_MODES:
+            raise ValueError(f"Unknown sweep mode: {mode}. Choose from {SWEEP_MODES}.")
+        self.sweep_mode = mode
+        self.rearm()
+
+    def set_frame(self, pre_trigger_samples, post_trigger_samples):
+        """Samples kept before and after the trigger point in each sweep; queued sweeps are dropped."""
+        self.pre_trigger_samples = max(0, int(pre_trigger_samples))
+        self.post_trigger_samples = max(1, int(post_trigger_samples))
+        # Gli sweep in coda erano stati presi con il vecchio frame
+        self._collected.clear()
+
+    def set_auto_timeout(self, samples):
+        """In Auto mode, free-run a sweep after this many samples without a trigger."""
+        self.auto_timeout_samples = max(1, int(samples))
+
+    @property
+    def trigger_enabled(self):
+        return self.pos_edge_enabled or self.neg_edge_enabled or self.derivative_enabled
+
+    def scan_block(self, block, start_index):
+        """Accepted trigger events in a block, ignoring the sweep state machine.
+
+        Returns (absolute indices, sub-sample offsets). Edge state, holdoff
+        and last_trigger_index carry over from the previous block, so
+        consecutive blocks must be scanned in order.
+        """
+        previous = self.last_value
+        self.last_value = block[-1]
+        if self.derivative_enabled:
+            hits = slope_events(block, self.derivative_threshold, previous) + start_index
+        elif self.trigger_type == "Edge":
+            hits, self._edge_state = hysteresis_edges(
+                block, self.trigger_level, self.hysteresis,
+                rising=self.pos_edge_enabled, state=self._edge_state)
+            hits = hits + start_index
+        else:
+            hits = self._advanced_events(block, start_index, previous)
+        # Non si riarma prima di aver acquisito la parte dopo il trigger
+        holdoff = max(self.holdoff_samples, self.post_trigger_samples)
+        triggers = apply_holdoff(hits, holdoff, self.last_trigger_index)
+        if triggers.size:
+            self.last_trigger_index = int(triggers[-1])
+        if not self.derivative_enabled and self.trigger_type in ("Edge", "Pulse <", "Pulse >"):
+            # Interpolazione solo sui trigger accettati (fronte o fine dell'impulso su trigger_level)
+            offsets = crossing_offsets(block, triggers - start_index, self.trigger_level, previous)
+        else:
+            offsets = np.zeros(triggers.shape, dtype=np.float64)
+        return triggers, offsets
+
+    def _advanced_events(self, block, start_index, previous):
+        # Indici assoluti degli eventi dei tipi basati su run e bande
+        positive = self.pos_edge_enabled
+        low, high = sorted((self.trigger_level, self.upper_level))
+        kind = self.trigger_type
+        if kind in ("Pulse <", "Pulse >"):
+            hits, self._run_state = pulse_width_events(
+                block, start_index, self.trigger_level, self.width_samples,
+                longer=kind == "Pulse >", positive=positive, state=self._run_state)
+        elif kind == "Runt":
+            hits, self._run_state = runt_events(
+                block, start_index, low, high, positive=positive, state=self._run_state)
+        elif kind in ("Window in", "Window out"):
+            hits = window_events(block, low, high, entering=kind == "Window in",
+                                 previous=previous) + start_index
+        else:
+            hits, self._run_state = slew_rate_events(
+                block, start_index, low, high, self.width_samples,
+                slower=kind == "Slew >", positive=positive, state=self._run_state)
+        return hits
+
+    def process_block(self, block, start_index):
+        """Run the sweep state machine on a block of new samples.
+
+        block is 1-D, start_index is the absolute sample index of block[0].
+        A trigger becomes a sweep once its post-trigger samples have
+        arrived; the handler then re-arms (Auto, Normal) or stops (Single).
+        Only the newest complete sweep is kept: sweeps completed between
+        two reads are dropped by overwriting one index. With collect_sweeps
+        every sweep is also queued for collected_since().
+        Returns True if a new sweep is ready.
+        """
+        n = block.shape[0]
+        if n == 0:
+            return False
+        end_index = start_index + n
+        if not self.trigger_enabled or self.sweep_mode == "Stop" or self.is_frozen:
+            self.last_value = block[-1]
+            return False
+
+        triggers, offsets = self.scan_block(block, start_index)
+        if self.pending_trigger is not None:
+            triggers = np.concatenate(([self.pending_trigger], triggers))
+            offsets = np.concatenate(([self.pending_offset], offsets))
+
+        n_complete = int(np.count_nonzero(triggers + self.post_trigger_samples <= end_index))
+        self.pending_trigger = None
+        if n_complete < triggers.size:
+            self.pending_trigger = int(triggers[n_complete])
+            self.pending_offset = float(offsets[n_complete])
+
+        if n_complete:
+            if self.sweep_mode == "Single":
+                # Single: il primo sweep completo, poi si ferma fino a rearm()
+                self._store_sweep(int(triggers[0]), True, 1, float(offsets[0]))
+                self._collect(triggers[:1], offsets[:1])
+                self.is_frozen = True
+                self.frozen_index = self.sweep_index
+                self.pending_trigger = None
+            else:
+                last = n_complete - 1
+                self._store_sweep(int(triggers[last]), True, n_complete, float(offsets[last]))
+                self._collect(triggers[:n_complete], offsets[:n_complete])
+            return True
+
+        if (self.sweep_mode == "Auto" and self.pending_trigger is None
+                and end_index - self._last_sweep_end >= self.auto_timeout_samples):
+            # Auto: nessun trigger entro il timeout, sweep libero sugli ultimi campioni
+            self._store_sweep(end_index - self.post_trigger_samples, False, 1)
+            self._collect(np.array([self.sweep_index]), np.zeros(1))
+            self.auto_sweeps += 1
+            return True
+        return False
+
+    def _store_sweep(self, trigger_index, triggered, count, offset=0.0):
+        self.sweep_index = trigger_index
+        self.sweep_offset = offset
+        self.sweep_triggered = triggered
+        self.sweep_generation += 1
+        self.sweeps_captured += count
+        self._last_sweep_end = trigger_index + self.post_trigger_samples
+
+    def _collect(self, trigger_indices, offsets):
+        if not self.collect_sweeps:
+            return
+        self._collected.append((self.sweep_generation, trigger_indices, offsets))
+        if len(self._collected) > self.MAX_COLLECTED_BLOCKS:
+            # Nessuno li sta leggendo (grafici nascosti): i più vecchi sono comunque sovrascritti
+            del self._collected[:-self.MAX_COLLECTED_BLOCKS]
+
+    def collected_since(self, generation):
+        """(generation, trigger_indices, offsets) of every queued sweep newer than generation.
+
+        Each reader keeps the returned generation and passes it back on the
+        next call, so several plots can share one handler.
+        """
+        blocks = [c for c in self._collected if c[0] > generation]
+        if not blocks:
+            return self.sweep_generation, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        indices = np.concatenate([c[1] for c in blocks]).astype(np.int64, copy=False)
+        offsets = np.concatenate([c[2] for c in blocks])
+        return self.sweep_generation, indices, offsets
+
+    def sweep_since(self, generation):
+        """(generation, trigger_index, triggered, offset) of the newest sweep if newer than generation, or None.
+
+        Like collected_since(), every reader keeps its own generation; the
+        trigger point itself lies at trigger_index + offset (offset in (-1, 0]).
+        """
+        if self.sweep_generation <= max(generation, self._armed_generation):
+            return None
+        if self.sweep_generation > self._shown_generation:
+            self._shown_generation = self.sweep_generation
+            self.sweeps_displayed += 1
+        return self.sweep_generation, self.sweep_index, self.sweep_triggered, self.sweep_offset
+
+    def take_sweep(self):
+        """(trigger_index, triggered, offset) of the newest sweep not yet taken, or None (single reader)."""
+        sweep = self.sweep_since(self._taken_generation)
+        if sweep is None:
+            return None
+        self._taken_generation = sweep[0]
+        return sweep[1:]
+
+    def rearm(self):
+        """Arm for the next sweep (used by Single after a capture and on mode changes)."""
+        self.is_frozen = False
+        self.pending_trigger = None
+        self._last_sweep_end = 0
+        # Uno sweep non ancora preso (o in coda per la persistenza) apparteneva
+        # all'armamento precedente
+        self._armed_generation = self.sweep_generation
+        self._collected.clear()
+
+    def sweep_stats(self):
+        return {
+            'captured': self.sweeps_captured,
+            'displayed': self.sweeps_displayed,
+            'dropped': self.sweeps_captured - self.sweeps_displayed,
+            'auto': self.auto_sweeps,
+        }
+
     def unfreeze(self):
         self.is_frozen = False
         self.frozen_data = None
-        self.frozen_index = None 
\ No newline at end of file
+        self.frozen_index = None
+        self.last_value = None
+        self._reset_scan_state()
+        self.pending_trigger = None
+        self.sweep_index = None
+        self._last_sweep_end = 0
+        self._armed_generation = self.sweep_generation 
\ No newline at end of file
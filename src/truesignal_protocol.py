@@ -0,0 +1,174 @@
+"""Binary frame format spoken by the TrueSignal USB hardware.
+
+Every frame has a fixed size and is little-endian:
+
+    offset 0   sync      uint16  0x5AA5 (bytes A5 5A)
+    offset 2   seq       uint16  frame counter, wraps at 65536
+    offset 4   samples   int16   samples_per_frame x channels, interleaved
+    end - 2    crc       uint16  CRC-16/CCITT (binascii.crc_hqx, init 0xFFFF)
+                                 over seq + samples
+
+Because frames have a fixed size, a whole run of aligned frames is decoded
+with a single np.frombuffer on a structured dtype.
+"""
+import binascii
+
+import numpy as np
+
+SYNC_WORD = 0x5AA5
+SYNC_BYTES = bytes((SYNC_WORD & 0xFF, SYNC_WORD >> 8))
+CRC_INIT = 0xFFFF
+DEFAULT_SAMPLES_PER_FRAME = 256
+DEFAULT_CHANNELS = 2
+
+
+def frame_dtype(samples_per_frame=DEFAULT_SAMPLES_PER_FRAME, channels=DEFAULT_CHANNELS):
+    return np.dtype([
+        ('sync', '<u2'),
+        ('seq', '<u2'),
+        ('samples', '<i2', (samples_per_frame, channels)),
+        ('crc', '<u2'),
+    ])
+
+
+def encode_frames(samples, first_seq=0):
+    """Encode an (n_frames, samples_per_frame, channels) int16 array into bytes."""
+    samples = np.asarray(samples, dtype='<i2')
+    n_frames, samples_per_frame, channels = samples.shape
+    frames = np.empty(n_frames, dtype=frame_dtype(samples_per_frame, channels))
+    frames['sync'] = SYNC_WORD
+    frames['seq'] = (first_seq + np.arange(n_frames)) & 0xFFFF
+    frames['samples'] = samples
+    raw = frames.view(np.uint8).reshape(n_frames, -1)
+    crc = frames['crc']
+    for i in range(n_frames):
+        crc[i] = binascii.crc_hqx(raw[i, 2:-2], CRC_INIT)
+    return frames.tobytes()
+
+
+class FrameParser:
+    """Incremental decoder for a TrueSignal byte stream.
+
+    Bytes are appended into a preallocated bytearray (see receive_view() and
+    commit()), then parse() decodes every complete frame in one pass and
+    keeps the partial tail for the next read. Sequence gaps are counted as
+    dropped frames (a frame rejected for its CRC also leaves a gap), CRC
+    failures as corrupt frames, and bytes skipped while resynchronising as
+    discarded bytes. A frame that fails its CRC is stepped over only when a
+    sync word follows it; otherwise bytes were lost inside it and the search
+    for the next sync word restarts from its second byte.
+    """
+
+    def __init__(self, samples_per_frame=DEFAULT_SAMPLES_PER_FRAME, channels=DEFAULT_CHANNELS,
+                 capacity_frames=1024):
+        self.samples_per_frame = samples_per_frame
+        self.channels = channels
+        self.dtype = frame_dtype(samples_per_frame, channels)
+        self.frame_size = self.dtype.itemsize
+        self.buffer = bytearray(self.frame_size * capacity_frames)
+        self._view = memoryview(self.buffer)
+        self.fill = 0
+
+        self.frames_ok = 0
+        self.frames_dropped = 0
+        self.frames_corrupt = 0
+        self.bytes_discarded = 0
+        self._last_seq = None
+
+    def receive_view(self):
+        """Writable view on the free part of the receive buffer."""
+        return self._view[self.fill:]
+
+    def commit(self, n_bytes):
+        self.fill += n_bytes
+
+    def feed(self, data):
+        """Copy bytes into the receive buffer (for sources without readinto)."""
+        n = len(data)
+        self._view[self.fill:self.fill + n] = data
+        self.fill += n
+
+    def parse(self):
+        """Decode all complete frames; return an (N, channels) int16 array.
+
+        The array views the receive buffer: copy it before the next read.
+        """
+        buf = np.frombuffer(self.buffer, dtype=np.uint8, count=self.fill)
+        pos = 0
+        chunks = []
+        while self.fill - pos >= self.frame_size:
+            n = (self.fill - pos) // self.frame_size
+            run = buf[pos:pos + n * self.frame_size].reshape(n, self.frame_size)
+            aligned = (run[:, 0] == SYNC_BYTES[0]) & (run[:, 1] == SYNC_BYTES[1])
+            if not aligned[0]:
+                pos = self._resync(buf, pos)
+                continue
+            # Numero di frame consecutivi allineati a partire da pos
+            k = n if aligned.all() else int(np.argmin(aligned))
+            frames = np.frombuffer(self.buffer, dtype=self.dtype, count=k, offset=pos)
+            samples, n_valid = self._check_frames(frames, run[:k])
+            chunks.append(samples)
+            pos += n_valid * self.frame_size
+            if n_valid == k:
+                continue
+            # Frame con CRC errato: se segue una sync word erano solo byte alterati,
+            # altrimenti il frame è troncato e il successivo inizia al suo interno
+            after = pos + self.frame_size
+            if self.fill - after < len(SYNC_BYTES):
+                break  # Serve il seguito per decidere: il frame resta nella coda
+            self.frames_corrupt += 1
+            if buf[after] == SYNC_BYTES[0] and buf[after + 1] == SYNC_BYTES[1]:
+                pos = after
+            else:
+                pos = self._resync(buf, pos)
+
+        if not chunks:
+            samples = np.empty((0, self.channels), dtype='<i2')
+        else:
+            samples = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+
+        # Sposta la coda incompleta all'inizio del buffer
+        remaining = self.fill - pos
+        if pos and remaining:
+            if len(chunks) == 1:
+                samples = samples.copy()  # La coda sovrascriverebbe i frame appena decodificati
+            self.buffer[:remaining] = self.buffer[pos:self.fill]
+        self.fill = remaining
+        return samples
+
+    def _resync(self, buf, pos):
+        idx = bytes(self._view[pos + 1:self.fill]).find(SYNC_BYTES)
+        if idx < 0:
+            # Tiene l'ultimo byte: potrebbe essere la prima metà della sync word
+            new_pos = self.fill - 1
+        else:
+            new_pos = pos + 1 + idx
+        self.bytes_discarded += new_pos - pos
+        return new_pos
+
+    def _check_frames(self, frames, raw):
+        """Accept the frames before the first CRC failure; return (samples, count)."""
+        crc = frames['crc']
+        n_valid = 0
+        while n_valid < frames.shape[0] and binascii.crc_hqx(raw[n_valid, 2:-2], CRC_INIT) == crc[n_valid]:
+            n_valid += 1
+        good = frames[:n_valid]
+        if n_valid == 0:
+            return np.empty((0, self.channels), dtype='<i2'), 0
+
+        seq = good['seq'].astype(np.int64)
+        if self._last_seq is not None:
+            seq = np.concatenate(([self._last_seq], seq))
+        gaps = (np.diff(seq) - 1) % 65536
+        self.frames_dropped += int(gaps.sum())
+        self._last_seq = int(seq[-1])
+        self.frames_ok += n_valid
+        return good['samples'].reshape(-1, self.channels), n_valid
+
+    def stats(self):
+        return {
+            'frames_ok': self.frames_ok,
+            'frames_dropped': self.frames_dropped,
+            'frames_corrupt': self.frames_corrupt,
+            'bytes_discarded': self.bytes_discarded,
+        }
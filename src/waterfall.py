@@ -0,0 +1,65 @@
+import numpy as np
+
+FLOOR_DB = -200.0  # 20 log10(1e-10), lo stesso minimo del grafico FFT
+
+
+class WaterfallRing:
+    """Rolling spectrogram: the last `history` spectra as rows of dB magnitudes.
+
+    Rows are stored in a mirrored ring like the DataHub: row i lives both
+    at i % history and at i % history + history, so view() is always one
+    contiguous (history, n_bins) slice, oldest row first, with no np.roll
+    and no copy. Memory is fixed at 2 x history x n_bins float32 whatever
+    the row rate; push() converts a whole batch of spectra at once.
+    """
+
+    def __init__(self, history=256, n_bins=513):
+        if history <= 0 or n_bins <= 0:
+            raise ValueError("Waterfall history and bins must be positive.")
+        self._rows = np.empty((2 * history, n_bins), dtype=np.float32)
+        self._db = np.empty((history, n_bins), dtype=np.float32)
+        self.write_index = 0
+        self.generation = 0
+        self.clear()
+
+    @property
+    def history(self):
+        return self._db.shape[0]
+
+    @property
+    def n_bins(self):
+        return self._rows.shape[1]
+
+    def clear(self):
+        self._rows.fill(FLOOR_DB)
+        self.write_index = 0
+        self.generation += 1
+
+    def push(self, magnitudes):
+        """Append one spectrum (n_bins,) or a batch (k, n_bins) of linear magnitudes, oldest first."""
+        magnitudes = np.atleast_2d(magnitudes)
+        if magnitudes.shape[1] != self.n_bins:
+            raise ValueError(f"Spectrum has {magnitudes.shape[1]} bins, waterfall expects {self.n_bins}.")
+        # Solo le ultime `history` righe possono sopravvivere
+        skipped = max(0, magnitudes.shape[0] - self.history)
+        self.write_index += skipped
+        k = magnitudes.shape[0] - skipped
+        db = self._db[:k]
+        np.maximum(magnitudes[skipped:], 1e-10, out=db, casting='same_kind')
+        np.log10(db, out=db)
+        db *= 20.0
+
+        pos = self.write_index % self.history
+        first = min(k, self.history - pos)
+        rest = k - first
+        for offset in (0, self.history):
+            self._rows[offset + pos:offset + pos + first] = db[:first]
+            if rest:
+                self._rows[offset:offset + rest] = db[first:]
+        self.write_index += k
+        self.generation += 1
+
+    def view(self):
+        """View (history, n_bins) of the rows, oldest first; rows never written read FLOOR_DB."""
+        pos = self.write_index % self.history
+        return self._rows[pos:pos + self.history]
@@ -0,0 +1,171 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.fft_engine import window_vector, RFFT_HAS_OUT
+
+AVERAGING_MODES = ("Linear", "Exponential")
+PSD_UNITS = ("V²/Hz", "dBV")
+# Righe di WelchPSD.traces
+AVERAGE, MAX_HOLD, MIN_HOLD = 0, 1, 2
+
+
+class WelchPSD:
+    """Streaming Welch power spectral density of several channels.
+
+    Blocks are appended as they arrive. Every hop = segment_len * (1 -
+    overlap) new samples complete one segment; the segments completed by
+    a block are windowed and transformed in one batched rfft and folded
+    into the average and the max/min-hold traces, so nothing is ever
+    recomputed from the start. Linear averaging is the mean of every
+    segment since reset(); exponential averaging weighs the newest
+    segment 1/n_averages (linear until n_averages segments are in).
+
+    traces is (3, channels, n_bins): AVERAGE, MAX_HOLD, MIN_HOLD rows of a
+    one-sided PSD in V²/Hz, normalised by fs * sum(w²) so that white
+    noise reads the same level whatever the window and segment length.
+    """
+
+    MAX_BATCH = 64  # Segmenti trasformati insieme al massimo
+
+    def __init__(self, segment_len=256, overlap=0.5, window="Hann", averaging="Exponential",
+                 n_averages=16, channels=2, sampling_rate_hz=1.0):
+        self.channels = int(channels)
+        self.sampling_rate_hz = float(sampling_rate_hz)
+        self.overlap = overlap
+        self.window_type = window
+        self.averaging = averaging
+        self.n_averages = n_averages
+        self.segment_len = 0
+        self._staging = np.zeros((self.channels, 0))
+        self._fill = 0
+        self.generation = 0
+        self.configure(segment_len)
+
+    @property
+    def n_bins(self):
+        return self.segment_len // 2 + 1
+
+    def configure(self, segment_len=None, overlap=None, window=None, averaging=None, n_averages=None):
+        """Change any setting (None keeps it); the averages restart."""
+        segment_len = int(segment_len or self.segment_len)
+        overlap = self.overlap if overlap is None else float(overlap)
+        window = window or self.window_type
+        averaging = averaging or self.averaging
+        n_averages = int(n_averages or self.n_averages)
+        if segment_len < 2:
+            raise ValueError("Welch segments must have at least 2 samples.")
+        if not 0.0 <= overlap < 1.0:
+            raise ValueError("Welch overlap must be in [0, 1).")
+        if averaging not in AVERAGING_MODES:
+            raise ValueError(f"Unknown averaging: {averaging}. Choose from {AVERAGING_MODES}.")
+        if n_averages < 1:
+            raise ValueError("Number of averages must be positive.")
+        self.overlap = overlap
+        self.hop = max(1, int(round(segment_len * (1.0 - overlap))))
+        self.window = window_vector(window, segment_len)
+        self.window_type = window
+        self.averaging = averaging
+        self.n_averages = n_averages
+
+        # Lo staging contiene al massimo MAX_BATCH segmenti completi
+        capacity = segment_len + self.hop * self.MAX_BATCH - 1
+        if segment_len != self.segment_len or self._staging.shape[1] != capacity:
+            self.segment_len = segment_len
+            self._staging = np.zeros((self.channels, capacity))
+            self._fill = 0
+            self._work = np.zeros((self.channels, self.MAX_BATCH, segment_len))
+            self._spectrum = np.empty((self.channels, self.MAX_BATCH, self.n_bins), dtype=np.complex128)
+            self._power = np.empty((self.channels, self.MAX_BATCH, self.n_bins))
+            self._delta = np.empty((self.channels, self.n_bins))
+            self.traces = np.zeros((3, self.channels, self.n_bins))
+            self.freqs = np.fft.rfftfreq(segment_len, d=1.0 / self.sampling_rate_hz)
+            self.freqs.flags.writeable = False
+        # Spettro a un lato: x2 tranne DC (e Nyquist se il segmento è pari)
+        self._scale = np.full(self.n_bins, 2.0 / (self.sampling_rate_hz * np.sum(self.window ** 2)))
+        self._scale[0] /= 2
+        if segment_len % 2 == 0:
+            self._scale[-1] /= 2
+        # Banda equivalente di rumore di un bin: PSD x enbw_hz = potenza del bin (V² rms)
+        self.enbw_hz = self.sampling_rate_hz * np.sum(self.window ** 2) / np.sum(self.window) ** 2
+        self.reset()
+
+    def reset(self):
+        """Restart the averages and the holds; the samples already staged are kept."""
+        self.segments = 0
+        self.traces[AVERAGE].fill(0.0)
+        self.traces[MAX_HOLD].fill(0.0)
+        self.traces[MIN_HOLD].fill(np.inf)
+        self.generation += 1
+
+    def update(self, block):
+        """Append an (N, channels) block and fold in every segment it completes."""
+        samples = block.T
+        n = samples.shape[1]
+        capacity = self._staging.shape[1]
+        pos = 0
+        while pos < n:
+            take = min(n - pos, capacity - self._fill)
+            self._staging[:, self._fill:self._fill + take] = samples[:self.channels, pos:pos + take]
+            self._fill += take
+            pos += take
+            if self._fill >= self.segment_len:
+                self._process_staged()
+
+    def _process_staged(self):
+        k = (self._fill - self.segment_len) // self.hop + 1
+        segments = sliding_window_view(self._staging[:, :self._fill], self.segment_len, axis=1)
+        work = self._work[:, :k]
+        np.multiply(segments[:, ::self.hop][:, :k], self.window, out=work)
+        spectrum = self._spectrum[:, :k]
+        if RFFT_HAS_OUT:
+            np.fft.rfft(work, axis=-1, out=spectrum)
+        else:
+            spectrum[...] = np.fft.rfft(work, axis=-1)
+        power = self._power[:, :k]
+        np.abs(spectrum, out=power)
+        np.square(power, out=power)
+        power *= self._scale
+        self._fold(power)
+
+        # I campioni non ancora usati tornano all'inizio dello staging
+        consumed = k * self.hop
+        rest = self._fill - consumed
+        self._staging[:, :rest] = self._staging[:, consumed:self._fill]
+        self._fill = rest
+
+    def _fold(self, power):
+        # power è (channels, k, n_bins): k nuovi segmenti
+        k = power.shape[1]
+        np.maximum(self.traces[MAX_HOLD], power.max(axis=1), out=self.traces[MAX_HOLD])
+        np.minimum(self.traces[MIN_HOLD], power.min(axis=1), out=self.traces[MIN_HOLD])
+        average = self.traces[AVERAGE]
+        if self.averaging == "Linear":
+            # Media di tutti i segmenti dal reset, aggiornata senza ricalcolarla
+            average *= self.segments / (self.segments + k)
+            average += power.sum(axis=1) / (self.segments + k)
+            self.segments += k
+        else:
+            for i in range(k):
+                alpha = max(1.0 / (self.segments + 1), 1.0 / self.n_averages)
+                np.subtract(power[:, i], average, out=self._delta)
+                self._delta *= alpha
+                average += self._delta
+                self.segments += 1
+        self.generation += 1
+
+
+def psd_in_units(traces, units, enbw_hz, out):
+    """Convert V²/Hz traces to units (one of PSD_UNITS) into out, and return out.
+
+    dBV is the rms voltage of each bin: 10 log10(PSD x equivalent noise bandwidth).
+    Both are floored at 1e-20 V² so that empty bins stay finite on a log axis.
+    """
+    if units == "V²/Hz":
+        np.maximum(traces, 1e-20, out=out)
+    elif units == "dBV":
+        np.multiply(traces, enbw_hz, out=out)
+        np.maximum(out, 1e-20, out=out)
+        np.log10(out, out=out)
+        out *= 10.0
+    else:
+        raise ValueError(f"Unknown PSD units: {units}. Choose from {PSD_UNITS}.")
+    return out